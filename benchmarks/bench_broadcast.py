@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from notturno import Broadcaster, WebSocket
+from notturno.core.http.deflate import PerMessageDeflate
+
+
+class NullTransport(asyncio.WriteTransport):
+    # Accepts everything, so only the server side of the fan-out is timed.
+    def __init__(self):
+        super().__init__()
+        self.written = 0
+
+    def write(self, data) -> None:
+        self.written += len(data)
+
+    def writelines(self, data) -> None:
+        for chunk in data:
+            self.write(chunk)
+
+    def get_write_buffer_size(self) -> int:
+        return 0
+
+    def is_closing(self) -> bool:
+        return False
+
+
+class NullWriter:
+    def __init__(self):
+        self.transport = NullTransport()
+        self.write = self.transport.write
+        self.writelines = self.transport.writelines
+
+    async def drain(self) -> None:
+        pass
+
+
+def connect(compressed: bool) -> WebSocket:
+    ws = WebSocket("/", {}, "HTTP/1.1")
+    ws._writer = NullWriter()
+    ws._accepted = True
+    if compressed:
+        _, ws.compression = PerMessageDeflate().negotiate("permessage-deflate")
+    return ws
+
+
+async def run(name: str, clients: int, message: str, count: int, compressed: bool):
+    sockets = [connect(compressed) for _ in range(clients)]
+
+    started = time.perf_counter()
+    for _ in range(count):
+        for ws in sockets:
+            await ws.send(message)
+    loop = time.perf_counter() - started
+
+    hub = Broadcaster()
+    for ws in sockets:
+        hub.subscribe(ws, "events")
+    started = time.perf_counter()
+    for _ in range(count):
+        hub.publish("events", message)
+    fanout = time.perf_counter() - started
+
+    print(f"{name} ({clients} clients, {count} messages)")
+    for label, elapsed in (("send() per client", loop), ("Broadcaster", fanout)):
+        print(
+            f"  {label:<18} {elapsed / count * 1e3:10.2f} ms/message  {elapsed / count / clients * 1e6:8.2f} us/client"
+        )
+
+
+if __name__ == "__main__":
+    event = '{"type": "tick", "symbol": "NOCT", "price": 101.25}'
+    asyncio.run(run("small text", 10000, event, 20, False))
+    asyncio.run(run("4 KiB text, permessage-deflate", 10000, event * 80, 20, True))
@@ -0,0 +1,75 @@
+import timeit
+
+from notturno.core.http.parser import HTTPParser
+
+REQUEST = (
+    b"POST /api/items?page=2 HTTP/1.1\r\n"
+    b"Host: localhost:8000\r\n"
+    b"User-Agent: bench/1.0\r\n"
+    b"Accept: */*\r\n"
+    b"Accept-Encoding: gzip, deflate\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: 34\r\n"
+    b"\r\n"
+    b'{"status":200,"message":"Success"}'
+)
+
+
+def legacy_parse_http_message(http_message):
+    # NoctServ.parse_http_message before the incremental parser.
+    if not http_message.strip():
+        return None, {}, ""
+
+    lines = http_message.splitlines()
+    start_line = lines[0] if lines else ""
+    parts = start_line.split()
+
+    if len(parts) < 3:
+        return None, {}, ""
+
+    method = parts[0]
+    path = parts[1]
+    http_version = parts[2]
+    headers = {}
+    header_lines = []
+
+    for line in lines[1:]:
+        if line == "":
+            break
+        header_lines.append(line)
+
+    for header in header_lines:
+        key, value = header.split(": ", 1)
+        headers[key] = value
+
+    body_start_index = len(header_lines) + 2
+    body = "\n".join(lines[body_start_index:])
+
+    return method, path, headers, body, http_version
+
+
+def legacy():
+    legacy_parse_http_message(REQUEST.decode())
+
+
+parser = HTTPParser()
+
+
+def incremental():
+    parser.feed(REQUEST)
+
+
+def incremental_split():
+    parser.feed(REQUEST[:40])
+    parser.feed(REQUEST[40:])
+
+
+if __name__ == "__main__":
+    number = 200_000
+    for name, func in (
+        ("legacy parse_http_message", legacy),
+        ("HTTPParser.feed", incremental),
+        ("HTTPParser.feed (2 segments)", incremental_split),
+    ):
+        elapsed = min(timeit.repeat(func, number=number, repeat=5))
+        print(f"{name:<30} {elapsed / number * 1e6:.3f} us/request")
@@ -0,0 +1,49 @@
+import timeit
+import tracemalloc
+from http.client import responses
+
+from notturno.core.http.serializer import ResponseSerializer
+from notturno.models.response import Response
+
+serializer = ResponseSerializer()
+
+
+def legacy(body: bytes) -> bytes:
+    # The native response path before ResponseSerializer: bytes bodies were
+    # decoded to str, formatted into one f-string and encoded again.
+    text = body.decode("utf-8")
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "Content-Length": len(text),
+        "Server": "NoctServ",
+        "Connection": "keep-alive",
+    }
+    joined = "\r\n".join(f"{key}: {value}" for key, value in headers.items())
+    response = f"HTTP/1.1 200 {responses.get(200)}\r\n{joined}\r\n\r\n{text}"
+    return response.encode("utf-8")
+
+
+def serialized(body: bytes) -> list:
+    resp = Response(body=body, headers={"Content-Type": "application/octet-stream"})
+    return serializer.serialize(resp, True)
+
+
+def peak_allocation(func, body: bytes) -> int:
+    tracemalloc.start()
+    func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    for size in (64, 64 * 1024, 8 * 1024 * 1024):
+        body = b"x" * size
+        number = max(10, 2_000_000 // max(size, 1024))
+        print(f"body {size} bytes")
+        for name, func in (("legacy f-string", legacy), ("ResponseSerializer", serialized)):
+            elapsed = min(timeit.repeat(lambda: func(body), number=number, repeat=5))
+            peak = peak_allocation(func, body)
+            print(
+                f"  {name:<20} {elapsed / number * 1e6:10.2f} us  peak alloc {peak / 1024:10.1f} KiB"
+            )
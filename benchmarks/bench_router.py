@@ -0,0 +1,69 @@
+import time
+import timeit
+
+from notturno.core.router.radix import RadixRouter
+from notturno.core.router.regexp import PathRouter
+
+
+def handler():
+    return None
+
+
+def routes(count: int):
+    # Half static, half dynamic routes spread over distinct prefixes.
+    for index in range(count // 2):
+        yield f"/static{index}/items"
+        yield f"/users{index}/:id/posts/:post"
+
+
+def build_legacy(count: int) -> PathRouter:
+    # add_route recompiles the whole alternation per call, which makes
+    # registering thousands of routes quadratic; compile once instead so
+    # the benchmark measures lookups only. The combined regex also cannot
+    # repeat a group name, so every route gets its own param names.
+    router = PathRouter()
+    for index, pattern in enumerate(routes(count)):
+        if ":" in pattern:
+            regex = pattern.replace(":id", f"(?P<id{index}>[^/]+)").replace(
+                ":post", f"(?P<post{index}>[^/]+)"
+            )
+            router.routes.setdefault("GET", []).append((regex, handler))
+        else:
+            router.static_routes.setdefault("GET", {})[pattern] = handler
+    router.compile_routes("GET")
+    return router
+
+
+def build_radix(count: int, cache_size: int = 0) -> RadixRouter:
+    router = RadixRouter(cache_size=cache_size)
+    for pattern in routes(count):
+        router.add_route("GET", pattern, handler)
+    return router
+
+
+if __name__ == "__main__":
+    for count in (100, 1_000, 10_000):
+        last = count // 2 - 1
+        paths = {
+            "static": f"/static{last}/items",
+            "dynamic first": "/users0/42/posts/7",
+            "dynamic last": f"/users{last}/42/posts/7",
+        }
+        started = time.perf_counter()
+        radix = build_radix(count)
+        registration = time.perf_counter() - started
+        cached = build_radix(count, cache_size=1024)
+        legacy = build_legacy(count)
+        print(f"{count} routes (RadixRouter registration {registration * 1000:.1f} ms)")
+        for label, path in paths.items():
+            for name, func, number in (
+                ("PathRouter.match", lambda: legacy.match(path), 200_000 // count),
+                ("RadixRouter.lookup", lambda: radix.lookup("GET", path), 20_000),
+                (
+                    "RadixRouter.lookup (LRU)",
+                    lambda: cached.lookup("GET", path),
+                    20_000,
+                ),
+            ):
+                elapsed = min(timeit.repeat(func, number=number, repeat=3))
+                print(f"  {label:<14} {name:<26} {elapsed / number * 1e6:10.2f} us")
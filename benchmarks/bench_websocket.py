@@ -0,0 +1,78 @@
+import asyncio
+import os
+import struct
+import time
+
+from notturno.core.http.frames import OP_BINARY, apply_mask, frame_header
+from notturno.models.websocket import WebSocket
+
+
+def client_frame(payload: bytes) -> bytes:
+    mask = os.urandom(4)
+    length = len(payload)
+    if length < 126:
+        head = bytes((0x80 | OP_BINARY, 0x80 | length))
+    elif length < 65536:
+        head = bytes((0x80 | OP_BINARY, 0x80 | 126)) + struct.pack("!H", length)
+    else:
+        head = bytes((0x80 | OP_BINARY, 0x80 | 127)) + struct.pack("!Q", length)
+    return head + mask + apply_mask(payload, mask)
+
+
+async def legacy_recv(reader: asyncio.StreamReader):
+    # WebSocket.recv before the frame codec: unchecked read(n) calls and a
+    # per-byte generator to unmask.
+    data = await reader.read(2)
+    length = data[1] & 127
+    if length == 126:
+        length = struct.unpack(">H", await reader.read(2))[0]
+    elif length == 127:
+        length = struct.unpack(">Q", await reader.read(8))[0]
+    mask = await reader.read(4)
+    message = await reader.read(length)
+    return bytearray(b ^ mask[i % 4] for i, b in enumerate(message))
+
+
+def filled_reader(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader(limit=len(data) + 1)
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+async def run(name: str, size: int, count: int):
+    payload = os.urandom(size)
+    data = client_frame(payload) * count
+
+    reader = filled_reader(data)
+    started = time.perf_counter()
+    for _ in range(count):
+        await legacy_recv(reader)
+    legacy = time.perf_counter() - started
+
+    reader = filled_reader(data)
+    ws = WebSocket("/", {}, "HTTP/1.1")
+    ws._reader = reader
+    started = time.perf_counter()
+    for _ in range(count):
+        await ws.recv()
+    codec = time.perf_counter() - started
+
+    header = frame_header(OP_BINARY, size)
+    started = time.perf_counter()
+    for _ in range(count):
+        frame_header(OP_BINARY, size)
+    encode = time.perf_counter() - started
+
+    mib = size * count / (1024 * 1024)
+    print(f"{name} ({count} messages, {len(header)}-byte server header)")
+    for label, elapsed in (("legacy recv", legacy), ("FrameReader recv", codec)):
+        print(
+            f"  {label:<18} {elapsed / count * 1e6:12.2f} us/message  {mib / elapsed:10.1f} MiB/s"
+        )
+    print(f"  {'frame_header':<18} {encode / count * 1e6:12.2f} us/message")
+
+
+if __name__ == "__main__":
+    asyncio.run(run("32 B", 32, 20000))
+    asyncio.run(run("1 MiB", 1024 * 1024, 10))
@@ -1,10 +1,15 @@
 
 from .app import Notturno
+from .broadcast import Broadcaster
+from .core.http.deflate import PerMessageDeflate
 from .gear import Gear
+from .models.headers import Headers
 from .models.request import Request
-from .models.response import Response
+from .models.response import FileResponse, Response, StreamingResponse
 from .models.websocket import WebSocket
 from .middleware import BaseMiddleware
+from .staticfiles import StaticFiles
+from .utils.multipart import UploadFile
 from .lib import __version__
 
-__all__ = ["Notturno", "Gear", "Request", "Response", "WebSocket", "BaseMiddleware", "__version__"]
+__all__ = ["Notturno", "Broadcaster", "Gear", "Headers", "Request", "Response", "StreamingResponse", "FileResponse", "WebSocket", "PerMessageDeflate", "BaseMiddleware", "StaticFiles", "UploadFile", "__version__"]
@@ -0,0 +1,199 @@
+import atexit
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from http.client import responses
+
+from colorama import Fore, Style
+
+from .logger import ColoredFormatter
+from .types import ACCESS_LOG
+from .utils.log import stat_color
+
+_LEVELS = {
+    False: f"[{ColoredFormatter.COLORS['INFO']}INFO{Style.RESET_ALL}]    ",
+    True: f"[{ColoredFormatter.COLORS['ERROR']}ERROR{Style.RESET_ALL}]   ",
+}
+
+
+def _client(peername) -> str:
+    if isinstance(peername, (tuple, list)) and len(peername) >= 2:
+        return f"{peername[0]}:{peername[1]}"
+    return "-"
+
+
+def _format_color(entry) -> str:
+    _, peername, method, path, http_version, status_code, duration, error = entry
+    return (
+        f'{_LEVELS[error]} {_client(peername)} - "{Style.BRIGHT}{Fore.WHITE}{method} {path} {http_version}{Style.RESET_ALL}" '
+        f"{stat_color(status_code)}{status_code} {responses.get(status_code)}{Fore.RESET}\n"
+    )
+
+
+def _format_compact(entry) -> str:
+    timestamp, peername, method, path, http_version, status_code, duration, _ = entry
+    when = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(timestamp))
+    took = "-" if duration is None else f"{duration * 1000:.2f}ms"
+    return f'{when} {_client(peername)} "{method} {path} {http_version}" {status_code} {took}\n'
+
+
+def _format_json(entry) -> str:
+    timestamp, peername, method, path, http_version, status_code, duration, _ = entry
+    return (
+        json.dumps(
+            {
+                "time": timestamp,
+                "client": _client(peername),
+                "method": method,
+                "path": path,
+                "http_version": http_version,
+                "status": status_code,
+                "duration_ms": None if duration is None else round(duration * 1000, 3),
+            },
+            ensure_ascii=False,
+        )
+        + "\n"
+    )
+
+
+_FORMATTERS = {
+    "color": _format_color,
+    "compact": _format_compact,
+    "json": _format_json,
+}
+
+
+class AccessLogger:
+    """Access log written from a background thread.
+
+    ``log`` only appends a tuple of raw values to a bounded queue; a writer
+    thread formats the queued entries and writes them to ``stream`` in
+    batches, so request handlers never format strings or block on the
+    stream. When disabled, ``log`` returns before doing anything, and
+    callers check ``enabled`` first to skip even collecting the values.
+    ``sample_rate`` logs only that fraction of requests; responses with a
+    5xx status are always logged. When the queue is full the oldest entries
+    are dropped and counted in ``dropped``.
+    """
+
+    def __init__(
+        self,
+        format: ACCESS_LOG | bool = "color",
+        sample_rate: float = 1.0,
+        stream=None,
+        max_queue: int = 10000,
+        flush_interval: float = 0.1,
+    ):
+        self.stream = stream
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = deque(maxlen=max_queue)
+        self._thread = None
+        self._pid = None
+        self._registered = False
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.configure(format, sample_rate)
+
+    def configure(self, format: ACCESS_LOG | bool = "color", sample_rate: float = 1.0):
+        if format is True:
+            format = "color"
+        if format and format not in _FORMATTERS:
+            raise ValueError(f"Unknown access log format: {format}")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1.")
+        self.format = format or None
+        self.sample_rate = sample_rate
+        self.enabled = bool(format) and sample_rate > 0.0
+        self._formatter = _FORMATTERS.get(format)
+
+    def log(
+        self,
+        peername,
+        method: str,
+        path: str,
+        http_version: str,
+        status_code: int,
+        started: float | None = None,
+        error: bool = False,
+    ) -> None:
+        if not self.enabled:
+            return
+        if (
+            self.sample_rate < 1.0
+            and status_code < 500
+            and random.random() >= self.sample_rate
+        ):
+            return
+        if self._pid != os.getpid():
+            self._start()
+        queue = self._queue
+        if len(queue) == self.max_queue:
+            self.dropped += 1
+        queue.append(
+            (
+                time.time(),
+                peername,
+                method,
+                path,
+                http_version,
+                status_code,
+                None if started is None else time.perf_counter() - started,
+                error,
+            )
+        )
+
+    def _start(self) -> None:
+        with self._lock:
+            # A forked worker inherits the queue but not the writer thread.
+            if self._pid == os.getpid():
+                return
+            self._queue.clear()
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(
+                target=self._run, name="notturno-access-log", daemon=True
+            )
+            self._thread.start()
+            if not self._registered:
+                self._registered = True
+                atexit.register(self.stop)
+            self._pid = os.getpid()
+
+    def _write(self) -> None:
+        queue = self._queue
+        if not queue:
+            return
+        formatter = self._formatter or _format_color
+        lines = []
+        while queue:
+            try:
+                lines.append(formatter(queue.popleft()))
+            except IndexError:
+                break
+        stream = self.stream or sys.stderr
+        try:
+            stream.write("".join(lines))
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def _run(self) -> None:
+        stopping = self._stopping
+        while not stopping.wait(self.flush_interval):
+            self._write()
+        self._write()
+
+    def stop(self) -> None:
+        """Writes out queued entries and stops the writer thread."""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid():
+            return
+        self._stopping.set()
+        thread.join()
+        self._thread = None
+        self._pid = None
@@ -1,8 +1,8 @@
 import asyncio
-import inspect
 from functools import partial, wraps
 from http.client import responses
-from typing import Any, Callable, Dict
+from time import perf_counter
+from typing import Any, Callable, Dict, Hashable
 
 try:
     import uvicorn
@@ -10,22 +10,40 @@ except ModuleNotFoundError:
     uvicorn = None
 
 
+from .accesslog import AccessLogger
+from .core.handler import HandlerPlan
 from .core.http.serv import NoctServ
-from .core.router.regexp import PathRouter
-from .models.request import Request, from_asgi
-from .models.response import Response
-from .types import LOOP
+from .core.http.workers import Supervisor
+from .exceptions import ClientDisconnected, HTTPParseError, WebsocketClosed
+from .core.router.radix import RadixRouter
+from .models.headers import Headers
+from .models.request import Request
+from .models.response import Response, StreamingResponse
+from .models.websocket import WebSocket
+from .types import ACCESS_LOG, ENGINE, LOOP
 from .utils import http
 from .logger import logger
 
 class Notturno:
-    def __init__(self, lifespan=None):
-        self._router = PathRouter()
+    def __init__(
+        self,
+        lifespan=None,
+        router_cache_size: int = 0,
+        max_body_size: int | None = None,
+    ):
+        self._router = RadixRouter(cache_size=router_cache_size)
         self.dependencies = {}
-        self._internal_router = PathRouter()
+        self._internal_router = RadixRouter()
         self.__is_main = self.__is_non_gear()
         self.lifespan = lifespan
+        # Largest request body accepted, on ASGI and by default on NoctServ.
+        self.max_body_size = max_body_size
         self.middlewares = []
+        # HandlerPlan -> composed middleware chain, or None without middleware.
+        self._chains = {}
+        self.asgi_middlewares = []
+        self._asgi_app = None
+        self.access_log = AccessLogger()
         self.http = NoctServ(self)
         self.logger = logger
 
@@ -44,8 +62,17 @@ class Notturno:
             cls.dependencies.update(self.dependencies)
             self.dependencies.update(cls.dependencies)
 
-            cls.middlewares = list(set(self.middlewares + cls.middlewares))
-            self.middlewares = list(set(cls.middlewares + self.middlewares))
+            # Both apps end up with the same chain: this app's middleware
+            # first, then the merged app's, each added once.
+            merged = list(dict.fromkeys(self.middlewares + cls.middlewares))
+            self.middlewares = merged
+            cls.middlewares = list(merged)
+            self._chains.clear()
+            cls._chains.clear()
+            for entry in cls.asgi_middlewares:
+                if entry not in self.asgi_middlewares:
+                    self.asgi_middlewares.append(entry)
+            self._asgi_app = None
 
         else:
             self._raise_apptype_error(cls)
@@ -68,6 +95,11 @@ class Notturno:
                 )
                 return await func(*args, **kwargs)
 
+            # Read by HandlerPlan, which injects without going through wrapper.
+            # functools.wraps copies both attributes onto any decorator
+            # stacked above, so the plan checks that it has this very wrapper.
+            wrapper._inject = (self.dependencies, dependency_names)
+            wrapper._inject_wrapper = wrapper
             return wrapper
 
         return decorator
@@ -106,7 +138,7 @@ class Notturno:
             {
                 "type": "http.response.start",
                 "status": status,
-                "headers": [[b"Content-Type", b"text/plain"]],
+                "headers": [(b"content-type", b"text/plain")],
             }
         )
         await send(
@@ -117,6 +149,39 @@ class Notturno:
             }
         )
 
+    async def __asgi_websocket_handle(
+        self, scope: Dict[str, Any], receive: Any, send: Any
+    ):
+        # The handshake request arrives as websocket.connect; closing
+        # before accepting makes the server reject it with 403.
+        message = await receive()
+        if message["type"] != "websocket.connect":
+            return
+        route, params = await self._resolve_internal("WS", scope["path"])
+        if not route:
+            await send({"type": "websocket.close", "code": 1000})
+            return
+        path = scope["path"]
+        if scope.get("query_string"):
+            path = f"{path}?{scope['query_string'].decode('latin-1')}"
+        ws = WebSocket(
+            path,
+            Headers(raw=scope["headers"]),
+            f"HTTP/{scope.get('http_version', '1.1')}",
+        )
+        ws._is_native = False
+        ws._send = send
+        ws._receive = receive
+        if route.request_arg:
+            params[route.request_arg] = ws
+        try:
+            await route.call(params)
+            if not ws._close_sent and ws.close_code is None:
+                # The handler returned without closing the connection.
+                await ws.close()
+        except WebsocketClosed:
+            pass
+
     async def __asgi_http_handle(
         self, scope: Dict[str, Any], receive: Any, send: Any
     ):
@@ -124,49 +189,134 @@ class Notturno:
         if not route:
             await self.__send_error(send, 404)
             return
-        req = await from_asgi(scope, receive)
-        arg_name = await self._route(func=route, is_type=Request)
-        if self.middleware:
-            route = partial(route, **params)
-            resp = await http.wrap_middleware(
-                route, req, http.convert_body, self.middlewares, arg_name
-            )
-        else:
-            if arg_name:
-                params[arg_name] = req
-            if asyncio.iscoroutinefunction(route):
-                resp = await route(**params)
+        req = Request.from_asgi(scope, receive, self.max_body_size)
+        req.path_params = params
+        try:
+            if route.coalesce:
+                key = (
+                    route.coalesce_key(req)
+                    if route.coalesce_key is not None
+                    else (
+                        scope["method"],
+                        scope["path"],
+                        scope["query_string"],
+                        req.headers.get("authorization"),
+                        req.headers.get("cookie"),
+                    )
+                )
+                resp = await route.coalesced(
+                    key, partial(self._dispatch, route, params, req)
+                )
             else:
-                resp = route(**params)
-        resp = http.convert_body(resp)
+                resp = await self._dispatch(route, params, req)
+        except HTTPParseError as e:
+            # Raised while receiving the body: too large or timed out.
+            await self.__send_error(send, e.status_code)
+            return
+        except ClientDisconnected:
+            return
         await send(
             {
                 "type": "http.response.start",
                 "status": resp.status_code,
-                "headers": [
-                    [key.encode("utf-8"), value.encode("utf-8")]
-                    for key, value in resp.headers.items()
-                ],
+                "headers": resp.headers.raw,
             }
         )
-        await send(
-            {
-                "type": "http.response.body",
-                "body": resp.body,
-                "more_body": False,
-            }
+        if isinstance(resp, StreamingResponse):
+            async for chunk in resp:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": True,
+                    }
+                )
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": b"",
+                    "more_body": False,
+                }
+            )
+        else:
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": resp.body,
+                    "more_body": False,
+                }
+            )
+
+    def __log_asgi(self, scope: Dict[str, Any], status_code: int, started):
+        path = scope["path"]
+        if scope.get("query_string"):
+            path = f"{path}?{scope['query_string'].decode('latin-1')}"
+        self.access_log.log(
+            scope.get("client"),
+            scope["method"],
+            path,
+            f"HTTP/{scope.get('http_version', '1.1')}",
+            status_code,
+            started,
         )
 
+    def add_asgi_middleware(self, middleware, **options):
+        """Wraps the ASGI application in ``middleware(app, **options)``.
+
+        ASGI middleware works on scope/receive/send, before any ``Request``
+        or ``Response`` is built, and also runs for NoctServ, which then
+        passes its HTTP requests through the ASGI interface. The first
+        middleware added is the outermost one.
+        """
+        self.asgi_middlewares.append((middleware, options))
+        self._asgi_app = None
+
+    def _build_asgi_app(self):
+        app = self.__asgi_dispatch
+        for middleware, options in reversed(self.asgi_middlewares):
+            app = middleware(app, **options)
+        self._asgi_app = app
+        return app
+
     def add_middleware(self, func):
         self.middlewares.append(func)
+        self._chains.clear()
 
     def middleware(self):
         def decorator(func):
-            self.middlewares.append(func)
+            self.add_middleware(func)
             return func
 
         return decorator
 
+    def _middleware_chain(self, plan: HandlerPlan):
+        """Returns the middleware chain for ``plan``, composing it on first
+        use after the middleware changed, or None when it has none."""
+        try:
+            return self._chains[plan]
+        except KeyError:
+            pass
+        middlewares = self.middlewares + list(plan.middlewares)
+        chain = (
+            http.compose_middleware(plan, http.convert_body, middlewares)
+            if middlewares
+            else None
+        )
+        self._chains[plan] = chain
+        return chain
+
+    async def _dispatch(self, plan: HandlerPlan, params: dict, request):
+        """Runs the middleware chain, or the handler directly when there is
+        none, and returns the converted response."""
+        chain = self._middleware_chain(plan)
+        if chain is not None:
+            response = await chain(request)
+        elif plan.request_arg:
+            response = await plan.call({**params, plan.request_arg: request})
+        else:
+            response = await plan.call(params)
+        return http.convert_body(response)
+
     async def _convert_response(self, response):
         if isinstance(response, Response):
             return response
@@ -183,43 +333,67 @@ class Notturno:
             raise TypeError(
                 "You cannot start a server with anything Notturno.Gear as your main."
             )
+        app = self._asgi_app or self._build_asgi_app()
+        access_log = self.access_log
+        if scope["type"] != "http" or not access_log.enabled:
+            await app(scope, receive, send)
+            return
+        # Logged here so responses sent by ASGI middleware are included.
+        started = perf_counter()
+        status_code = 500
+
+        async def send_logged(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await app(scope, receive, send_logged)
+        finally:
+            self.__log_asgi(scope, status_code, started)
+
+    async def __asgi_dispatch(self, scope: Dict[str, Any], receive: Any, send: Any):
         if scope["type"] == "http":
             await self.__asgi_http_handle(scope, receive, send)
         elif scope["type"] == "websocket":
-            pass
+            await self.__asgi_websocket_handle(scope, receive, send)
         elif scope["type"] == "lifespan":
             await self.__asgi_lifespan_handle(scope, receive, send)
 
     def __normalize_path(self, path: str) -> str:
         return path.rstrip("/")
 
-    async def _route(self, func: Callable, is_type) -> Any:
-        return next(
-            (
-                param_name
-                for param_name, param in inspect.signature(func).parameters.items()
-                if param.annotation is is_type
-            ),
-            None,
-        )
-
     async def resolve(
         self, method: str, path: str
     ) -> tuple[None, dict] | tuple[Any | None, dict]:
-        route = self._router.match(path)
-        if not route or not route.get(method):
-            return (None, None)
-        return (route.get(method)["func"], route.get(method)["params"])
+        return self._router.lookup(method, path)
+
+    def route(
+        self,
+        route: str,
+        method: list = ["GET"],
+        middlewares: list = None,
+        coalesce: bool | Callable[[Request], Hashable] = False,
+    ):
+        """Registers a handler for ``route``.
+
+        ``middlewares`` run for this route only, inside the app's. With
+        ``coalesce``, concurrent identical requests share one run of the
+        handler and its middleware. Requests are identical when method,
+        path, query string, ``Authorization`` and ``Cookie`` match, or
+        when ``coalesce(request)`` returns equal keys if it is a function.
+        """
 
-    def route(self, route: str, method: list = ["GET"]):
         def decorator(func):
             route_normalized = self.__normalize_path(route)
             if isinstance(func, staticmethod):
                 func = func.__func__
             func._router_method = method
+            plan = HandlerPlan(func, Request, middlewares or (), coalesce)
             for m in method:
                 met = m.upper()
-                self._router.add_route(met, route_normalized, func)
+                self._router.add_route(met, route_normalized, plan)
             return func
 
         return decorator
@@ -227,15 +401,18 @@ class Notturno:
     async def _resolve_internal(
         self, method: str, path: str
     ) -> tuple[None, dict] | tuple[Any | None, dict]:
-        route = self._internal_router.match(path)
-        if not route or not route.get(method):
-            return (None, None)
-        return (route.get(method)["func"], route.get(method)["params"])
+        return self._internal_router.lookup(method, path)
 
     def serve_asgi(
-        self, host: str = "127.0.0.1", port: int = 8765, loop: LOOP = "auto"
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        loop: LOOP = "auto",
+        access_log: ACCESS_LOG | bool = "color",
+        access_log_sample_rate: float = 1.0,
     ) -> None:
         if uvicorn:
+            self.access_log.configure(access_log, access_log_sample_rate)
             if loop == "winloop":
                 import platform
 
@@ -243,7 +420,14 @@ class Notturno:
                     uvicorn.config.LOOP_SETUPS["winloop"] = (
                         "notturno.loops.winloop:winloop_setup"
                     )
-            uvicorn.run(self, host=host, port=port, loop=loop)
+            # The app writes its own access log.
+            uvicorn.run(
+                self,
+                host=host,
+                port=port,
+                loop=loop,
+                access_log=not self.access_log.enabled,
+            )
         else:
             raise ModuleNotFoundError(
                 "uvicorn not found, can be installed with pip install uvicorn."
@@ -257,35 +441,100 @@ class Notturno:
         ssl: bool = False,
         certfile: str = "cert.pem",
         keyfile: str = "key.pem",
+        keep_alive: bool = True,
+        keep_alive_timeout: float = 5.0,
+        max_requests_per_connection: int = 1000,
+        engine: ENGINE = "streams",
+        workers: int = 1,
+        reuse_port: bool | None = None,
+        header_timeout: float = 10.0,
+        body_timeout: float = 30.0,
+        max_connections: int | None = None,
+        backlog: int = 2048,
+        max_header_size: int = 65536,
+        max_body_size: int | None = None,
+        stream_threshold: int = 65536,
+        shutdown_timeout: float = 30.0,
+        access_log: ACCESS_LOG | bool = "color",
+        access_log_sample_rate: float = 1.0,
     ) -> None:
         if not self.__is_main:
             raise TypeError(
                 "You cannot start a server with anything Notturno.Gear as your main."
             )
         self.ssl = ssl
+        self.access_log.configure(access_log, access_log_sample_rate)
+
+        options = {
+            "host": host,
+            "port": port,
+            "server_hide": hide_server_version,
+            "use_ssl": ssl,
+            "certfile": certfile,
+            "keyfile": keyfile,
+            "keep_alive": keep_alive,
+            "keep_alive_timeout": keep_alive_timeout,
+            "max_requests_per_connection": max_requests_per_connection,
+            "engine": engine,
+            "header_timeout": header_timeout,
+            "body_timeout": body_timeout,
+            "max_connections": max_connections,
+            "backlog": backlog,
+            "max_header_size": max_header_size,
+            "max_body_size": (
+                max_body_size if max_body_size is not None else self.max_body_size
+            ),
+            "stream_threshold": stream_threshold,
+            "shutdown_timeout": shutdown_timeout,
+        }
+        if workers > 1:
+            # Leave the workers time to run lifespan shutdown after draining.
+            Supervisor(
+                self,
+                options,
+                workers=workers,
+                reuse_port=reuse_port,
+                shutdown_timeout=shutdown_timeout + 10.0,
+            ).run()
+        else:
+            self._run_server(options)
 
-        loop = asyncio.get_event_loop()
+    def _run_server(self, options: dict) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        main = loop.create_task(self.http.serve(**options))
         try:
-            loop.run_until_complete(
-                self.http.serve(
-                    host=host,
-                    port=port,
-                    server_hide=hide_server_version,
-                    use_ssl=ssl,
-                    certfile=certfile,
-                    keyfile=keyfile,
-                )
-            )
-        except KeyboardInterrupt:
-            loop.run_until_complete(self.http.graceful_exit())
-        except SystemExit:
-            loop.run_until_complete(self.http.graceful_exit())
+            loop.run_until_complete(main)
+        except (KeyboardInterrupt, SystemExit):
+            # Only reached where NoctServ could not install signal handlers.
+            self.http.request_shutdown()
+            if main.done():
+                loop.run_until_complete(self.http.graceful_exit())
+            else:
+                loop.run_until_complete(main)
+        finally:
+            # Forked workers exit without running atexit hooks.
+            self.access_log.stop()
 
-    def get(self, route: str):
-        return self.route(route, method=["GET"])
+    def get(
+        self,
+        route: str,
+        middlewares: list = None,
+        coalesce: bool | Callable[[Request], Hashable] = False,
+    ):
+        return self.route(
+            route, method=["GET"], middlewares=middlewares, coalesce=coalesce
+        )
 
-    def post(self, route: str):
-        return self.route(route, method=["POST"])
+    def post(
+        self,
+        route: str,
+        middlewares: list = None,
+        coalesce: bool | Callable[[Request], Hashable] = False,
+    ):
+        return self.route(
+            route, method=["POST"], middlewares=middlewares, coalesce=coalesce
+        )
 
     def ws(self, route: str):
         def decorator(func):
@@ -293,7 +542,10 @@ class Notturno:
             if isinstance(func, staticmethod):
                 func = func.__func__
             func._router_method = "WS"
-            self._internal_router.add_route("WS", route_normalized, func)
+            plan = HandlerPlan(func, WebSocket)
+            if not plan.is_coroutine:
+                raise TypeError("Websocket is Only to use in coroutine function.")
+            self._internal_router.add_route("WS", route_normalized, plan)
             return func
 
         return decorator
@@ -303,7 +555,9 @@ class Notturno:
             if isinstance(func, staticmethod):
                 func = func.__func__
             func._router_method = "HTTPSTAT"
-            self._internal_router.add_route("HTTPSTAT", code, func)
+            self._internal_router.add_route(
+                "HTTPSTAT", code, HandlerPlan(func, Request)
+            )
             return func
 
         return decorator
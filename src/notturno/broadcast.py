@@ -0,0 +1,316 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple
+
+from .core.http.deflate import Deflate, compress_message
+from .core.http.frames import (
+    CLOSE_POLICY_VIOLATION,
+    OP_BINARY,
+    OP_TEXT,
+    frame_header,
+)
+from .exceptions import WebsocketClosed
+from .models.websocket import CLOSE_TIMEOUT, WebSocket
+
+OVERFLOW_POLICIES = ("drop", "disconnect")
+
+
+class _Message:
+    """A published message, shared by every subscriber it is sent to.
+
+    Frames are built on first use and cached, so each variant (plain, or
+    compressed for a given window size) is encoded once however many
+    connections it goes out on.
+    """
+
+    __slots__ = ("data", "payload", "opcode", "published_at", "_frames")
+
+    def __init__(self, data: str | bytes, published_at: float):
+        self.data = data
+        if isinstance(data, str):
+            self.opcode, self.payload = OP_TEXT, data.encode("utf-8")
+        else:
+            self.opcode, self.payload = OP_BINARY, bytes(data)
+        self.published_at = published_at
+        self._frames: Dict[Optional[int], Tuple[bytes, int]] = {}
+
+    def frame(self, codec: Optional[Deflate]) -> Tuple[bytes, int]:
+        """Returns the frame to write for a connection using ``codec``, and
+        the compressed payload size, or 0 for an uncompressed frame."""
+        payload = self.payload
+        key = None
+        if codec is not None and len(payload) >= codec.threshold:
+            key = codec.window_bits
+        cached = self._frames.get(key)
+        if cached is not None:
+            return cached
+        if key is None:
+            cached = frame_header(self.opcode, len(payload)) + payload, 0
+        else:
+            compressed = compress_message(
+                payload, key, codec.level, codec.mem_level
+            )
+            cached = (
+                frame_header(self.opcode, len(compressed), True, True) + compressed,
+                len(compressed),
+            )
+        self._frames[key] = cached
+        return cached
+
+
+class _Latency:
+    # The most recent samples, in seconds.
+    __slots__ = ("samples",)
+
+    def __init__(self, size: int):
+        self.samples: Deque[float] = deque(maxlen=size)
+
+    def summary(self) -> Dict[str, float]:
+        samples = sorted(self.samples)
+        count = len(samples)
+        if not count:
+            return {"count": 0, "avg": 0.0, "p50": 0.0, "p99": 0.0, "max": 0.0}
+        return {
+            "count": count,
+            "avg": sum(samples) / count,
+            "p50": samples[count // 2],
+            "p99": samples[min(count - 1, count * 99 // 100)],
+            "max": samples[-1],
+        }
+
+
+class _Subscriber:
+    __slots__ = ("ws", "channels", "transport", "queue", "task")
+
+    def __init__(self, ws: WebSocket):
+        self.ws = ws
+        self.channels: Set[str] = set()
+        # Frames go straight to the transport on NoctServ; behind an ASGI
+        # server, messages are handed to WebSocket.send.
+        self.transport: Optional[asyncio.WriteTransport] = (
+            ws._writer.transport if ws._is_native else None
+        )
+        self.queue: Deque[_Message] = deque()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def closed(self) -> bool:
+        ws = self.ws
+        if ws._close_sent or ws.close_code is not None:
+            return True
+        return self.transport is not None and self.transport.is_closing()
+
+
+class Broadcaster:
+    """Fans messages out to the websockets subscribed to named channels.
+
+    ``publish`` encodes each message once: native connections share the
+    same frame bytes, and those that negotiated ``permessage-deflate``
+    share one payload compressed without context per window size. A frame
+    is written straight to a connection's transport while its write buffer
+    is below ``write_buffer_limit``. Past that, messages wait in the
+    connection's own queue, flushed by a task of its own as the client
+    reads, so a slow client never holds up the others.
+
+    A queue holds at most ``max_queue`` messages. When it is full,
+    ``overflow="drop"`` discards its oldest message to make room for the
+    new one, and ``overflow="disconnect"`` closes the connection with 1008.
+
+    ``stats`` counts messages published, frames sent, messages queued,
+    dropped and clients disconnected. ``latency()`` summarizes the time
+    ``publish`` takes to reach every subscriber, and the time queued
+    messages wait before being written.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 256,
+        overflow: str = "drop",
+        write_buffer_limit: int = 64 * 1024,
+        latency_samples: int = 1024,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.write_buffer_limit = write_buffer_limit
+        self.stats = {
+            "published": 0,
+            "sent": 0,
+            "queued": 0,
+            "dropped": 0,
+            "disconnected": 0,
+        }
+        self._channels: Dict[str, Set[_Subscriber]] = {}
+        self._subscribers: Dict[WebSocket, _Subscriber] = {}
+        self._fanout = _Latency(latency_samples)
+        self._queue_delay = _Latency(latency_samples)
+        self._closing: Set[asyncio.Task] = set()
+
+    def subscribe(self, ws: WebSocket, *channels: str) -> None:
+        """Subscribes an accepted websocket to ``channels``."""
+        if not ws._accepted:
+            raise RuntimeError("The websocket must be accepted before subscribing")
+        sub = self._subscribers.get(ws)
+        if sub is None:
+            sub = self._subscribers[ws] = _Subscriber(ws)
+        for channel in channels:
+            sub.channels.add(channel)
+            self._channels.setdefault(channel, set()).add(sub)
+
+    def unsubscribe(self, ws: WebSocket, *channels: str) -> None:
+        """Unsubscribes ``ws`` from ``channels``, or from every channel when
+        none is given. Messages already queued for it are still sent unless
+        it leaves all of them."""
+        sub = self._subscribers.get(ws)
+        if sub is None:
+            return
+        for channel in channels or tuple(sub.channels):
+            sub.channels.discard(channel)
+            subscribers = self._channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(sub)
+                if not subscribers:
+                    del self._channels[channel]
+        if not sub.channels:
+            self._remove(sub)
+
+    def subscribers(self, channel: str) -> int:
+        return len(self._channels.get(channel, ()))
+
+    def publish(self, channel: str, message: str | bytes) -> int:
+        """Sends ``message`` to every subscriber of ``channel`` and returns
+        how many it was written or queued for.
+
+        It never waits on a client: frames that cannot be written right
+        away are queued, so this can be called from synchronous code.
+        """
+        started = time.perf_counter()
+        stats = self.stats
+        stats["published"] += 1
+        subscribers = self._channels.get(channel)
+        if not subscribers:
+            return 0
+        item = _Message(message, started)
+        limit = self.write_buffer_limit
+        reached = 0
+        gone = []
+        for sub in subscribers:
+            if sub.closed:
+                gone.append(sub)
+                continue
+            transport = sub.transport
+            if (
+                transport is not None
+                and not sub.queue
+                and transport.get_write_buffer_size() < limit
+            ):
+                self._write(sub, item)
+                reached += 1
+                continue
+            queue = sub.queue
+            if len(queue) >= self.max_queue:
+                if self.overflow == "disconnect":
+                    gone.append(sub)
+                    self._disconnect(sub)
+                    continue
+                queue.popleft()
+                stats["dropped"] += 1
+            queue.append(item)
+            stats["queued"] += 1
+            reached += 1
+            if sub.task is None:
+                sub.task = asyncio.ensure_future(self._flush(sub))
+        for sub in gone:
+            self._remove(sub)
+        self._fanout.samples.append(time.perf_counter() - started)
+        return reached
+
+    def latency(self) -> Dict[str, Dict[str, float]]:
+        """Summaries of the most recent ``publish`` durations (``fanout``)
+        and of the time queued messages waited (``queued``), in seconds."""
+        return {
+            "fanout": self._fanout.summary(),
+            "queued": self._queue_delay.summary(),
+        }
+
+    def _write(self, sub: _Subscriber, item: _Message) -> None:
+        codec = sub.ws.compression
+        frame, compressed_size = item.frame(codec)
+        sub.transport.write(frame)
+        if compressed_size:
+            codec.sent_shared(len(item.payload), compressed_size)
+        self.stats["sent"] += 1
+
+    async def _flush(self, sub: _Subscriber) -> None:
+        ws = sub.ws
+        queue = sub.queue
+        delays = self._queue_delay.samples
+        try:
+            while queue:
+                if sub.closed:
+                    break
+                if sub.transport is None:
+                    item = queue.popleft()
+                    await ws.send(item.data)
+                    self.stats["sent"] += 1
+                    delays.append(time.perf_counter() - item.published_at)
+                    continue
+                # Wait until the transport is below its high-water mark,
+                # then write at least one message and keep going while the
+                # buffer stays under the limit.
+                await ws._writer.drain()
+                if sub.closed:
+                    break
+                now = time.perf_counter()
+                while True:
+                    item = queue.popleft()
+                    self._write(sub, item)
+                    delays.append(now - item.published_at)
+                    if (
+                        not queue
+                        or sub.transport.get_write_buffer_size() >= self.write_buffer_limit
+                    ):
+                        break
+        except (ConnectionError, WebsocketClosed):
+            pass
+        finally:
+            sub.task = None
+        if queue:
+            # The connection went away with messages left for it.
+            self._remove(sub)
+
+    def _disconnect(self, sub: _Subscriber) -> None:
+        self.stats["disconnected"] += 1
+        task = asyncio.ensure_future(self._close(sub.ws))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, ws: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(
+                ws.close(CLOSE_POLICY_VIOLATION, "Client too slow"), CLOSE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            # The close frame is stuck behind data the client never reads.
+            if ws._is_native:
+                ws._writer.transport.abort()
+        except (ConnectionError, WebsocketClosed):
+            pass
+
+    def _remove(self, sub: _Subscriber) -> None:
+        if self._subscribers.get(sub.ws) is not sub:
+            return
+        del self._subscribers[sub.ws]
+        for channel in sub.channels:
+            subscribers = self._channels.get(channel)
+            if subscribers is not None:
+                subscribers.discard(sub)
+                if not subscribers:
+                    del self._channels[channel]
+        sub.channels.clear()
+        sub.queue.clear()
+        task = sub.task
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
@@ -0,0 +1,110 @@
+import asyncio
+import inspect
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from ..models.response import StreamingResponse
+
+
+class HandlerPlan:
+    """How to call a route handler, worked out once at registration.
+
+    Holds the name of the parameter that receives the ``Request`` (or
+    ``WebSocket``), whether the handler is a coroutine function, the
+    dependencies requested with ``Notturno.inject`` and the middleware
+    registered for this route only. A handler whose outermost decorator
+    is ``inject`` is called directly with the dependencies added to its
+    keyword arguments, skipping the wrapper; any other decorator is
+    called as is.
+
+    With ``coalesce`` set, identical concurrent requests share one
+    in-flight dispatch (see ``coalesced``). ``coalesce`` may be ``True``
+    or a function taking the ``Request`` and returning a hashable key.
+    """
+
+    __slots__ = (
+        "func",
+        "handler",
+        "request_arg",
+        "is_coroutine",
+        "dependencies",
+        "middlewares",
+        "coalesce",
+        "coalesce_key",
+        "_dependency_source",
+        "_inflight",
+    )
+
+    def __init__(
+        self,
+        func: Callable,
+        arg_type: type,
+        middlewares: Iterable[Callable] = (),
+        coalesce: bool | Callable[[Any], Hashable] = False,
+    ):
+        self.func = func
+        self.middlewares: Tuple[Callable, ...] = tuple(middlewares)
+        self.coalesce = bool(coalesce)
+        self.coalesce_key: Optional[Callable[[Any], Hashable]] = (
+            coalesce if callable(coalesce) else None
+        )
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        handler = func
+        source, names = {}, ()
+        if getattr(func, "_inject_wrapper", None) is func:
+            source, names = func._inject
+            handler = func.__wrapped__
+        self.handler = handler
+        self.dependencies: Tuple[str, ...] = tuple(names)
+        self._dependency_source: Dict[str, Any] = source
+        self.is_coroutine = asyncio.iscoroutinefunction(handler)
+        self.request_arg = next(
+            (
+                name
+                for name, param in inspect.signature(handler).parameters.items()
+                if param.annotation is arg_type
+                or param.annotation == arg_type.__name__
+            ),
+            None,
+        )
+
+    async def call(self, kwargs: Dict[str, Any]):
+        if self.dependencies:
+            source = self._dependency_source
+            for name in self.dependencies:
+                if name in source:
+                    kwargs[name] = source[name]
+        if self.is_coroutine:
+            return await self.handler(**kwargs)
+        return self.handler(**kwargs)
+
+    async def coalesced(self, key: Hashable, run: Callable[[], Awaitable[Any]]):
+        """Awaits ``run()``, or the ``run()`` already in flight for ``key``.
+
+        The first caller starts the dispatch as a task and later callers
+        with the same key wait for it, receiving the same response object
+        or the same exception. The task is shielded, so a disconnecting
+        client does not cancel it for the others. Streaming responses can
+        only be sent once, so waiters that get one run their own dispatch.
+        """
+        inflight = self._inflight
+        task = inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(run())
+            inflight[key] = task
+            task.add_done_callback(partial(self._landed, key))
+            return await asyncio.shield(task)
+        response = await asyncio.shield(task)
+        if isinstance(response, StreamingResponse):
+            return await run()
+        return response
+
+    def _landed(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Marks the exception as retrieved when every waiter is gone.
+            task.exception()
+
+    def __repr__(self):
+        return f"<HandlerPlan {getattr(self.func, '__qualname__', self.func)!r}>"
@@ -0,0 +1,112 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from ...exceptions import HTTPParseError
+
+# Bytes of a streamed body buffered ahead of the handler before the
+# protocol engine stops reading from the socket.
+HIGH_WATER = 256 * 1024
+
+
+class RequestBody:
+    """The body of a request that is still being received.
+
+    The parser pushes data in with ``feed_data``/``feed_eof`` and the
+    handler side takes it out with ``read``. On the protocol engine data is
+    pushed as it arrives and ``pause``/``resume`` stop and restart reading
+    from the transport while more than ``high_water`` bytes are waiting.
+    On the streams engine nothing reads the socket while a handler runs,
+    so ``read`` calls ``pull`` to read more whenever the buffer is empty.
+    """
+
+    def __init__(
+        self,
+        length: Optional[int] = None,
+        timeout: float = 30.0,
+        pull: Optional[Callable[[float], Awaitable[None]]] = None,
+        pause: Optional[Callable[[], None]] = None,
+        resume: Optional[Callable[[], None]] = None,
+        high_water: int = HIGH_WATER,
+    ):
+        self.length = length
+        self.timeout = timeout
+        self.high_water = high_water
+        self.received = 0
+        self._pull = pull
+        self._pause = pause
+        self._resume = resume
+        self._chunks = deque()
+        self._buffered = 0
+        self._paused = False
+        self._eof = False
+        self._error = None
+        self._waiter = None
+
+    @property
+    def at_eof(self) -> bool:
+        """Whether the whole body was received and read."""
+        return self._eof and not self._chunks
+
+    def feed_data(self, data: bytes) -> None:
+        if not data:
+            return
+        self._chunks.append(data)
+        self._buffered += len(data)
+        self.received += len(data)
+        if (
+            self._pause is not None
+            and not self._paused
+            and self._buffered > self.high_water
+        ):
+            self._paused = True
+            self._pause()
+        self._wakeup()
+
+    def feed_eof(self) -> None:
+        self._eof = True
+        self._wakeup()
+
+    def set_exception(self, exc: BaseException) -> None:
+        self._error = exc
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def read(self) -> bytes:
+        """Returns the next received chunk, or ``b""`` once the body is
+        complete."""
+        while not self._chunks:
+            if self._error is not None:
+                raise self._error
+            if self._eof:
+                return b""
+            if self._pull is not None:
+                await self._pull(self.timeout)
+                continue
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self._waiter, self.timeout)
+            except asyncio.TimeoutError:
+                raise HTTPParseError("Request Timeout", 408)
+            finally:
+                self._waiter = None
+        chunk = self._chunks.popleft()
+        self._buffered -= len(chunk)
+        if self._paused and self._buffered <= self.high_water // 2:
+            self._paused = False
+            self._resume()
+        return chunk
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        chunk = await self.read()
+        if not chunk:
+            raise StopAsyncIteration
+        return chunk
+
@@ -0,0 +1,249 @@
+import zlib
+from typing import Dict, Optional, Tuple
+
+from .frames import CLOSE_INVALID_DATA, CLOSE_TOO_BIG, FrameError
+
+_TAIL = b"\x00\x00\xff\xff"
+_PARAMS = frozenset(
+    (
+        "server_no_context_takeover",
+        "client_no_context_takeover",
+        "server_max_window_bits",
+        "client_max_window_bits",
+    )
+)
+
+
+class PerMessageDeflate:
+    """Server settings for the ``permessage-deflate`` extension (RFC 7692).
+
+    ``server_max_window_bits`` and ``server_no_context_takeover`` apply to
+    the messages the server sends, and may be lowered or turned on by the
+    client's offer. ``client_max_window_bits`` and
+    ``client_no_context_takeover`` are asked of the client to save memory
+    on its side. Messages shorter than ``threshold`` bytes are sent
+    uncompressed, since deflate rarely pays off on them.
+    """
+
+    def __init__(
+        self,
+        server_max_window_bits: int = 15,
+        client_max_window_bits: int = 15,
+        server_no_context_takeover: bool = False,
+        client_no_context_takeover: bool = False,
+        threshold: int = 128,
+        level: int = 6,
+        mem_level: int = 8,
+    ):
+        # zlib cannot produce raw deflate streams with an 8-bit window.
+        if not 9 <= server_max_window_bits <= 15:
+            raise ValueError("server_max_window_bits must be between 9 and 15")
+        if not 8 <= client_max_window_bits <= 15:
+            raise ValueError("client_max_window_bits must be between 8 and 15")
+        self.server_max_window_bits = server_max_window_bits
+        self.client_max_window_bits = client_max_window_bits
+        self.server_no_context_takeover = server_no_context_takeover
+        self.client_no_context_takeover = client_no_context_takeover
+        self.threshold = threshold
+        self.level = level
+        self.mem_level = mem_level
+
+    def negotiate(self, header: Optional[str]) -> Optional[Tuple[str, "Deflate"]]:
+        """Picks the first acceptable offer from a client's
+        ``Sec-WebSocket-Extensions`` header and returns the response
+        header value with the codec for the connection, or ``None``."""
+        if not header:
+            return None
+        for offer in header.split(","):
+            name, *raw_params = offer.split(";")
+            if name.strip().lower() != "permessage-deflate":
+                continue
+            accepted = self._accept(raw_params)
+            if accepted is not None:
+                return accepted
+        return None
+
+    def _accept(self, raw_params) -> Optional[Tuple[str, "Deflate"]]:
+        params: Dict[str, Optional[str]] = {}
+        for param in raw_params:
+            key, sep, value = param.strip().partition("=")
+            key = key.strip().lower()
+            if key not in _PARAMS or key in params:
+                return None
+            params[key] = value.strip().strip('"') if sep else None
+
+        server_no_context_takeover = (
+            self.server_no_context_takeover or "server_no_context_takeover" in params
+        )
+        client_no_context_takeover = (
+            self.client_no_context_takeover or "client_no_context_takeover" in params
+        )
+        server_bits = self.server_max_window_bits
+        if "server_max_window_bits" in params:
+            requested = _window_bits(params["server_max_window_bits"])
+            if requested is None or requested < 9:
+                return None
+            server_bits = min(server_bits, requested)
+        client_bits = None
+        if "client_max_window_bits" in params:
+            value = params["client_max_window_bits"]
+            offered = 15 if value is None else _window_bits(value)
+            if offered is None:
+                return None
+            if self.client_max_window_bits < offered or value is not None:
+                client_bits = min(self.client_max_window_bits, offered)
+
+        response = ["permessage-deflate"]
+        if server_no_context_takeover:
+            response.append("server_no_context_takeover")
+        if client_no_context_takeover:
+            response.append("client_no_context_takeover")
+        if server_bits < 15 or "server_max_window_bits" in params:
+            response.append(f"server_max_window_bits={server_bits}")
+        if client_bits is not None:
+            response.append(f"client_max_window_bits={client_bits}")
+        codec = Deflate(
+            server_bits,
+            server_no_context_takeover,
+            self.threshold,
+            self.level,
+            self.mem_level,
+            client_no_context_takeover,
+        )
+        return "; ".join(response), codec
+
+
+def _window_bits(value: Optional[str]) -> Optional[int]:
+    if value is None or not value.isdigit():
+        return None
+    bits = int(value)
+    return bits if 8 <= bits <= 15 else None
+
+
+class Deflate:
+    """The negotiated ``permessage-deflate`` codec of one connection.
+
+    ``stats`` counts the bytes of sent messages before and after
+    compression, and of received compressed messages before and after
+    inflating them. ``ratio`` is the size on the wire of sent messages
+    relative to their original size.
+    """
+
+    __slots__ = (
+        "window_bits",
+        "no_context_takeover",
+        "threshold",
+        "level",
+        "mem_level",
+        "client_no_context_takeover",
+        "stats",
+        "_compressor",
+        "_decompressor",
+    )
+
+    def __init__(
+        self,
+        window_bits: int = 15,
+        no_context_takeover: bool = False,
+        threshold: int = 128,
+        level: int = 6,
+        mem_level: int = 8,
+        client_no_context_takeover: bool = False,
+    ):
+        self.window_bits = window_bits
+        self.no_context_takeover = no_context_takeover
+        self.threshold = threshold
+        self.level = level
+        self.mem_level = mem_level
+        self.client_no_context_takeover = client_no_context_takeover
+        self.stats = {
+            "sent_messages": 0,
+            "sent_compressed": 0,
+            "sent_bytes": 0,
+            "sent_wire_bytes": 0,
+            "received_compressed": 0,
+            "received_bytes": 0,
+            "received_wire_bytes": 0,
+        }
+        self._compressor = None
+        # Inflating with the largest window works for any window the
+        # client used, so client_max_window_bits never matters here.
+        self._decompressor = zlib.decompressobj(-15)
+
+    @property
+    def ratio(self) -> float:
+        sent = self.stats["sent_bytes"]
+        return self.stats["sent_wire_bytes"] / sent if sent else 1.0
+
+    def compress(self, data: bytes) -> Optional[bytes]:
+        """Returns the compressed payload, or ``None`` when ``data`` is
+        below the threshold and goes out as is."""
+        stats = self.stats
+        stats["sent_messages"] += 1
+        stats["sent_bytes"] += len(data)
+        if len(data) < self.threshold:
+            stats["sent_wire_bytes"] += len(data)
+            return None
+        compressor = self._compressor
+        if compressor is None:
+            compressor = zlib.compressobj(
+                self.level, zlib.DEFLATED, -self.window_bits, self.mem_level
+            )
+            if not self.no_context_takeover:
+                self._compressor = compressor
+        payload = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        # A sync flush always ends with an empty stored block, which the
+        # receiver adds back.
+        payload = payload[:-4]
+        stats["sent_compressed"] += 1
+        stats["sent_wire_bytes"] += len(payload)
+        return payload
+
+    def sent_shared(self, size: int, wire_size: int) -> None:
+        """Accounts for a message compressed outside this codec, by
+        ``compress_message``, and sent on the connection.
+
+        The client's inflater now holds that message in its window, which
+        the context kept here does not know about, so the next message
+        starts a new one.
+        """
+        stats = self.stats
+        stats["sent_messages"] += 1
+        stats["sent_compressed"] += 1
+        stats["sent_bytes"] += size
+        stats["sent_wire_bytes"] += wire_size
+        self._compressor = None
+
+    def decompress(self, payload: bytes, max_size: Optional[int] = None) -> bytes:
+        """Inflates a received message, stopping as soon as it grows past
+        ``max_size``."""
+        decompressor = self._decompressor
+        try:
+            data = decompressor.decompress(
+                payload + _TAIL, 0 if max_size is None else max_size + 1
+            )
+        except zlib.error:
+            raise FrameError(CLOSE_INVALID_DATA, "Invalid compressed data")
+        # Without context takeover every message starts a new stream, and
+        # one ended with a final block has to be followed by a new one.
+        if self.client_no_context_takeover or decompressor.eof:
+            self._decompressor = zlib.decompressobj(-15)
+        if max_size is not None and len(data) > max_size:
+            raise FrameError(CLOSE_TOO_BIG, "Message too big")
+        self.stats["received_compressed"] += 1
+        self.stats["received_bytes"] += len(data)
+        self.stats["received_wire_bytes"] += len(payload)
+        return data
+
+
+def compress_message(
+    data: bytes, window_bits: int = 15, level: int = 6, mem_level: int = 8
+) -> bytes:
+    """Compresses ``data`` on its own, without any earlier context.
+
+    Such a payload can be inflated by any client that negotiated a window
+    of at least ``window_bits``, whatever it received before, so it can be
+    built once and sent on many connections.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -window_bits, mem_level)
+    return (compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
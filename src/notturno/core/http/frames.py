@@ -0,0 +1,176 @@
+import asyncio
+import struct
+from typing import Tuple
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# Set on the first frame of a message compressed with permessage-deflate.
+RSV1 = 0x40
+
+# Close codes from RFC 6455, section 7.4.1.
+CLOSE_NORMAL = 1000
+CLOSE_GOING_AWAY = 1001
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_NO_STATUS = 1005
+CLOSE_ABNORMAL = 1006
+CLOSE_INVALID_DATA = 1007
+CLOSE_POLICY_VIOLATION = 1008
+CLOSE_TOO_BIG = 1009
+
+_LENGTH_16 = struct.Struct("!BBH")
+_LENGTH_64 = struct.Struct("!BBQ")
+
+
+class FrameError(Exception):
+    """A frame broke the protocol; the connection has to be closed with
+    ``code``."""
+
+    def __init__(self, code: int, reason: str = ""):
+        super().__init__(reason)
+        self.code = code
+        self.reason = reason
+
+
+# Payloads from this size on are unmasked with translate tables rather
+# than one big integer XOR, which is about twice as fast there.
+_STRIDED_MIN = 4096
+# For each mask byte, the table mapping every byte to itself XOR the mask.
+_XOR_TABLES = [bytes(value ^ key for value in range(256)) for key in range(256)]
+
+
+def apply_mask(data: bytes, mask: bytes) -> bytes:
+    """XORs ``data`` with the repeated 4-byte ``mask``.
+
+    Small payloads and the repeated mask are each turned into one integer,
+    so the XOR runs over machine words in C instead of byte by byte in
+    Python. Larger ones are split into the four byte lanes of the mask,
+    each of which is XORed with a single byte by ``bytes.translate``.
+    """
+    length = len(data)
+    if not length:
+        return b""
+    if length < _STRIDED_MIN:
+        key = (mask * ((length >> 2) + 1))[:length]
+        return (
+            int.from_bytes(data, "little") ^ int.from_bytes(key, "little")
+        ).to_bytes(length, "little")
+    out = bytearray(data)
+    for lane in range(4):
+        out[lane::4] = data[lane::4].translate(_XOR_TABLES[mask[lane]])
+    return bytes(out)
+
+
+def frame_header(
+    opcode: int, length: int, fin: bool = True, rsv1: bool = False
+) -> bytes:
+    """Builds the header of an unmasked server frame; the payload is
+    written after it as is."""
+    first = opcode | (0x80 if fin else 0) | (RSV1 if rsv1 else 0)
+    if length < 126:
+        return bytes((first, length))
+    if length < 65536:
+        return _LENGTH_16.pack(first, 126, length)
+    return _LENGTH_64.pack(first, 127, length)
+
+
+def close_payload(code: int, reason: str = "") -> bytes:
+    if code == CLOSE_NO_STATUS:
+        return b""
+    # Control frames carry at most 125 bytes.
+    return code.to_bytes(2, "big") + reason.encode("utf-8")[:123]
+
+
+def parse_close(payload: bytes) -> Tuple[int, str]:
+    if not payload:
+        return CLOSE_NO_STATUS, ""
+    if len(payload) == 1:
+        raise FrameError(CLOSE_PROTOCOL_ERROR, "Invalid close frame")
+    code = int.from_bytes(payload[:2], "big")
+    if code < 1000 or code in (1004, 1005, 1006, 1015) or 1016 <= code < 3000:
+        raise FrameError(CLOSE_PROTOCOL_ERROR, "Invalid close code")
+    try:
+        reason = payload[2:].decode("utf-8")
+    except UnicodeDecodeError:
+        raise FrameError(CLOSE_INVALID_DATA, "Invalid close reason")
+    return code, reason
+
+
+class FrameReader:
+    """Reads client frames from a ``StreamReader``.
+
+    Each part of a frame is read with ``readexactly``, so short reads never
+    leak into the payload. ``initial`` holds bytes that were received
+    together with the upgrade request and come before the reader's data.
+    """
+
+    __slots__ = ("reader", "max_size", "rsv_allowed", "_initial")
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        max_size: int | None = None,
+        initial: bytes = b"",
+    ):
+        self.reader = reader
+        self.max_size = max_size
+        # RSV bits an extension negotiated a meaning for.
+        self.rsv_allowed = 0
+        self._initial = initial
+
+    async def _read(self, n: int) -> bytes:
+        initial = self._initial
+        if not initial:
+            return await self.reader.readexactly(n)
+        if len(initial) >= n:
+            self._initial = initial[n:]
+            return initial[:n]
+        self._initial = b""
+        return initial + await self.reader.readexactly(n - len(initial))
+
+    async def read_frame(self) -> Tuple[bool, int, int, bytes]:
+        """Returns ``(fin, opcode, rsv, payload)`` with the payload
+        unmasked. Raises ``asyncio.IncompleteReadError`` at end of stream
+        and ``FrameError`` for frames that break the protocol."""
+        # Client frames are always masked, so at least six bytes follow:
+        # the two header bytes and either the mask or the extended length.
+        head = await self._read(6)
+        first, second = head[0], head[1]
+        fin = bool(first & 0x80)
+        rsv = first & 0x70
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if rsv & ~self.rsv_allowed:
+            raise FrameError(CLOSE_PROTOCOL_ERROR, "Unexpected reserved bits")
+        if opcode >= OP_CLOSE:
+            if opcode > OP_PONG:
+                raise FrameError(CLOSE_PROTOCOL_ERROR, "Unknown opcode")
+            if not fin or length > 125:
+                raise FrameError(CLOSE_PROTOCOL_ERROR, "Invalid control frame")
+        elif opcode > OP_BINARY:
+            raise FrameError(CLOSE_PROTOCOL_ERROR, "Unknown opcode")
+        if not second & 0x80:
+            raise FrameError(CLOSE_PROTOCOL_ERROR, "Client frames must be masked")
+        if length < 126:
+            mask = head[2:]
+        elif length == 126:
+            length = int.from_bytes(head[2:4], "big")
+            mask = head[4:] + await self._read(2)
+        else:
+            extended = head[2:] + await self._read(8)
+            length = int.from_bytes(extended[:8], "big")
+            if length >> 63:
+                raise FrameError(CLOSE_PROTOCOL_ERROR, "Invalid frame length")
+            mask = extended[8:]
+        if (
+            self.max_size is not None
+            and length > self.max_size
+            and opcode < OP_CLOSE
+        ):
+            raise FrameError(CLOSE_TOO_BIG, "Message too big")
+        payload = await self._read(length) if length else b""
+        return fin, opcode, rsv, apply_mask(payload, mask)
@@ -0,0 +1,301 @@
+import re
+from typing import Any, Callable, List, Optional, Tuple
+
+from ...exceptions import HTTPParseError
+from ...models.headers import Headers
+
+ParsedRequest = Tuple[str, str, Headers, Any, str]
+
+_HEAD = 0
+_BODY = 1
+_CHUNK_SIZE = 2
+_CHUNK_DATA = 3
+_TRAILERS = 4
+_UPGRADED = 5
+
+# Hex digits only, as int(..., 16) would also take "0x", signs, "_" and
+# whitespace, which a proxy in front may read differently.
+_CHUNK_SIZE_LINE = re.compile(rb"([0-9A-Fa-f]{1,16})(?:[ \t]*;.*)?")
+
+
+class HTTPParser:
+    """Incremental HTTP/1.x request parser working on raw bytes.
+
+    Data is pushed with ``feed`` as it arrives from the socket, and every
+    request that became complete is returned as a
+    ``(method, path, headers, body, http_version)`` tuple. Only the request
+    line is decoded; header fields are kept as lowercased byte pairs in a
+    ``Headers`` and the body as ``bytes``.
+
+    When ``body_factory`` is set, requests with a chunked body or one larger
+    than ``stream_threshold`` are returned as soon as their head is parsed,
+    with a stream made by ``body_factory(content_length)`` as the body; the
+    rest of the body is fed into it as it arrives.
+    """
+
+    def __init__(
+        self,
+        max_header_size: int = 65536,
+        max_body_size: int | None = None,
+        stream_threshold: int = 65536,
+        body_factory: Optional[Callable[[Optional[int]], Any]] = None,
+    ):
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.stream_threshold = stream_threshold
+        self.body_factory = body_factory
+        self._stream = None
+        self._buffer = bytearray()
+        self._state = _HEAD
+        self._scan_from = 0
+        self._remaining = 0
+        self._chunks: List[bytes] = []
+        self._chunked_size = 0
+        self._trailer_size = 0
+        self._current = None
+        self._upgrade = False
+        self._error = None
+
+    @property
+    def upgraded(self) -> bool:
+        return self._state == _UPGRADED
+
+    @property
+    def in_body(self) -> bool:
+        """Whether a request head was parsed and its body is still incomplete."""
+        return self._current is not None
+
+    @property
+    def has_partial(self) -> bool:
+        """Whether part of a request has been received but not completed."""
+        return self._current is not None or bool(self._buffer)
+
+    def abort(self, exc: BaseException) -> None:
+        """Fails the body being streamed, if any, e.g. when the connection
+        is lost."""
+        if self._stream is not None:
+            self._stream.set_exception(exc)
+            self._stream = None
+
+    def unconsumed(self) -> bytes:
+        """Returns the bytes received after an upgrade request."""
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+    def feed(self, data: bytes) -> List[ParsedRequest]:
+        if self._error is not None:
+            raise self._error
+        completed = []
+        try:
+            return self._feed(data, completed)
+        except HTTPParseError as e:
+            if self._stream is not None:
+                # The request was already handed out, so the error goes to
+                # its handler through the body; the connection is unusable.
+                self.abort(e)
+                self._error = e
+                return completed
+            # Hand out the requests completed before the error first; the
+            # error is raised on the next call.
+            if not completed:
+                raise
+            self._error = e
+            return completed
+
+    def _feed(
+        self, data: bytes, completed: List[ParsedRequest]
+    ) -> List[ParsedRequest]:
+        if self._buffer:
+            self._buffer += data
+            buffer = self._buffer
+        else:
+            # Common case: nothing is left over from the previous read, so
+            # parse straight out of the received bytes without copying them.
+            buffer = data
+        size = len(buffer)
+        pos = 0
+        while pos < size and self._state != _UPGRADED:
+            state = self._state
+            if state == _HEAD:
+                end = self._parse_head(buffer, pos)
+                if end == -1:
+                    break
+                pos = end
+                if self._state == _HEAD:
+                    completed.append(self._finish(b""))
+                elif self._stream is not None:
+                    completed.append(self._emit(self._stream))
+            elif state == _BODY:
+                if self._stream is not None:
+                    end = min(size, pos + self._remaining)
+                    self._stream.feed_data(bytes(buffer[pos:end]))
+                    self._remaining -= end - pos
+                    pos = end
+                    if not self._remaining:
+                        self._end_stream()
+                    continue
+                end = pos + self._remaining
+                if end > size:
+                    break
+                completed.append(self._finish(bytes(buffer[pos:end])))
+                pos = end
+            elif state == _CHUNK_SIZE:
+                end = buffer.find(b"\r\n", pos)
+                if end == -1:
+                    if size - pos > 1024:
+                        raise HTTPParseError("Invalid chunk size")
+                    break
+                match = _CHUNK_SIZE_LINE.fullmatch(buffer, pos, end)
+                if match is None:
+                    raise HTTPParseError("Invalid chunk size")
+                chunk_size = int(match.group(1), 16)
+                pos = end + 2
+                self._chunked_size += chunk_size
+                if (
+                    self.max_body_size is not None
+                    and self._chunked_size > self.max_body_size
+                ):
+                    raise HTTPParseError("Payload Too Large", 413)
+                if chunk_size == 0:
+                    self._state = _TRAILERS
+                else:
+                    self._remaining = chunk_size
+                    self._state = _CHUNK_DATA
+            elif state == _CHUNK_DATA:
+                if self._stream is not None:
+                    if self._remaining:
+                        end = min(size, pos + self._remaining)
+                        self._stream.feed_data(bytes(buffer[pos:end]))
+                        self._remaining -= end - pos
+                        pos = end
+                    if pos + 2 > size:
+                        break
+                    if buffer[pos : pos + 2] != b"\r\n":
+                        raise HTTPParseError("Invalid chunk terminator")
+                    pos += 2
+                    self._state = _CHUNK_SIZE
+                    continue
+                end = pos + self._remaining
+                if end + 2 > size:
+                    break
+                if buffer[end : end + 2] != b"\r\n":
+                    raise HTTPParseError("Invalid chunk terminator")
+                self._chunks.append(bytes(buffer[pos:end]))
+                pos = end + 2
+                self._state = _CHUNK_SIZE
+            elif state == _TRAILERS:
+                end = buffer.find(b"\r\n", pos)
+                trailer_size = self._trailer_size + (
+                    (size if end == -1 else end) - pos
+                )
+                if trailer_size > self.max_header_size:
+                    raise HTTPParseError("Request Header Fields Too Large", 431)
+                if end == -1:
+                    break
+                if end != pos:
+                    # Trailer fields are skipped, but count towards the limit.
+                    self._trailer_size = trailer_size + 2
+                else:
+                    self._chunked_size = 0
+                    self._trailer_size = 0
+                    if self._stream is not None:
+                        self._end_stream()
+                    else:
+                        body = b"".join(self._chunks)
+                        self._chunks = []
+                        completed.append(self._finish(body))
+                pos = end + 2
+
+        if buffer is self._buffer:
+            del buffer[:pos]
+        elif pos < size:
+            self._buffer += buffer[pos:]
+        return completed
+
+    def _parse_head(self, buffer, pos: int) -> int:
+        while buffer.startswith(b"\r\n", pos):
+            pos += 2
+        end = buffer.find(b"\r\n\r\n", pos + self._scan_from)
+        if end == -1:
+            if len(buffer) - pos > self.max_header_size:
+                raise HTTPParseError("Request Header Fields Too Large", 431)
+            self._scan_from = max(0, len(buffer) - pos - 3)
+            return -1
+        if end - pos > self.max_header_size:
+            raise HTTPParseError("Request Header Fields Too Large", 431)
+        self._scan_from = 0
+
+        lines = bytes(buffer[pos:end]).split(b"\r\n")
+        parts = lines[0].decode("latin-1").split(" ")
+        if len(parts) != 3:
+            raise HTTPParseError("Invalid request line")
+        method, path, http_version = parts
+        if not http_version.startswith("HTTP/1."):
+            raise HTTPParseError("Unsupported HTTP version", 505)
+
+        raw = []
+        for line in lines[1:]:
+            name, sep, value = line.partition(b":")
+            if not sep or not name:
+                raise HTTPParseError("Invalid header line")
+            raw.append((name.lower(), value.strip()))
+        headers = Headers(raw=raw)
+
+        content_length = None
+        lengths = headers.getall("content-length", [])
+        if lengths:
+            value = lengths[0]
+            if not (value.isascii() and value.isdigit()) or any(
+                other != value for other in lengths[1:]
+            ):
+                raise HTTPParseError("Invalid Content-Length")
+            content_length = int(value)
+            if self.max_body_size is not None and content_length > self.max_body_size:
+                raise HTTPParseError("Payload Too Large", 413)
+        chunked = False
+        transfer_encoding = headers.getall("transfer-encoding", [])
+        if transfer_encoding:
+            # A body framed both ways is a request smuggling attempt.
+            if lengths:
+                raise HTTPParseError("Both Transfer-Encoding and Content-Length")
+            codings = [
+                coding.strip().lower()
+                for value in transfer_encoding
+                for coding in value.split(",")
+            ]
+            if codings[-1] != "chunked":
+                raise HTTPParseError("Transfer-Encoding must end with chunked")
+            if len(codings) > 1:
+                raise HTTPParseError("Unsupported Transfer-Encoding", 501)
+            chunked = True
+        upgrade = headers.get("upgrade", "").lower() == "websocket"
+
+        self._current = (method, path, headers, http_version)
+        self._upgrade = upgrade
+        if chunked:
+            self._state = _CHUNK_SIZE
+        elif content_length:
+            self._remaining = content_length
+            self._state = _BODY
+        if (
+            self.body_factory is not None
+            and not upgrade
+            and (chunked or (content_length or 0) > self.stream_threshold)
+        ):
+            self._stream = self.body_factory(None if chunked else content_length)
+        return end + 4
+
+    def _emit(self, body) -> ParsedRequest:
+        method, path, headers, http_version = self._current
+        self._current = None
+        return (method, path, headers, body, http_version)
+
+    def _finish(self, body: bytes) -> ParsedRequest:
+        self._state = _UPGRADED if self._upgrade else _HEAD
+        return self._emit(body)
+
+    def _end_stream(self) -> None:
+        self._stream.feed_eof()
+        self._stream = None
+        self._state = _HEAD
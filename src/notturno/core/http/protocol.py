@@ -0,0 +1,189 @@
+import asyncio
+from collections import deque
+
+from ...exceptions import ClientDisconnected
+
+# Stop reading from a client that pipelines more requests than this
+# until the handler side catches up.
+MAX_PIPELINED = 32
+
+
+class TransportWriter:
+    """The subset of ``asyncio.StreamWriter`` used by NoctServ, writing
+    straight to the transport of a ``NoctProtocol``."""
+
+    def __init__(self, transport: asyncio.Transport, protocol: "NoctProtocol"):
+        self.transport = transport
+        self._protocol = protocol
+
+    def write(self, data) -> None:
+        self.transport.write(data)
+
+    def writelines(self, data) -> None:
+        self.transport.writelines(data)
+
+    async def drain(self) -> None:
+        protocol = self._protocol
+        if protocol._connection_lost:
+            raise ConnectionResetError("Connection lost")
+        if protocol._write_paused:
+            waiter = protocol._loop.create_future()
+            protocol._drain_waiters.append(waiter)
+            await waiter
+
+    def get_extra_info(self, name, default=None):
+        return self.transport.get_extra_info(name, default)
+
+    def is_closing(self) -> bool:
+        return self.transport.is_closing()
+
+    def close(self) -> None:
+        self.transport.close()
+
+    async def wait_closed(self) -> None:
+        await self._protocol._closed
+
+
+class NoctProtocol(asyncio.Protocol):
+    """``asyncio.Protocol`` engine for NoctServ.
+
+    Received data is fed straight into the HTTP parser from
+    ``data_received`` and responses are written to the transport, skipping
+    the ``StreamReader``/``StreamWriter`` buffering layers. Once a websocket
+    upgrade is parsed, further data is routed to a ``StreamReader`` so
+    ``WebSocket`` keeps working unchanged.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self._loop = asyncio.get_running_loop()
+        self._parser = server._new_parser(
+            pause=self._pause_body, resume=self._resume_body
+        )
+        self._pending = deque()
+        self._served = 0
+        self._error = None
+        self._waiter = None
+        self._eof = False
+        self._connection_lost = False
+        self._read_paused = False
+        self._body_paused = False
+        self._write_paused = False
+        self._drain_waiters = []
+        self._closed = self._loop.create_future()
+        self.transport = None
+        self.reader = None
+        self.writer = None
+        self.task = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.reader = asyncio.StreamReader(loop=self._loop)
+        # Lets the reader pause the transport when websocket data piles up.
+        self.reader.set_transport(transport)
+        self.writer = TransportWriter(transport, self)
+        self.task = self._loop.create_task(
+            self.server._serve_connection(self.reader, self.writer, self.next_request)
+        )
+
+    def data_received(self, data: bytes) -> None:
+        parser = self._parser
+        if parser.upgraded:
+            self.reader.feed_data(data)
+            return
+        try:
+            self._pending.extend(parser.feed(data))
+        except Exception as e:
+            self._error = e
+        if parser.upgraded:
+            leftover = parser.unconsumed()
+            if leftover:
+                self.reader.feed_data(leftover)
+        if len(self._pending) >= MAX_PIPELINED and not self._read_paused:
+            self._read_paused = True
+            if not self._body_paused:
+                self.transport.pause_reading()
+        self._wakeup()
+
+    def _pause_body(self) -> None:
+        # A streamed request body is arriving faster than its handler reads it.
+        self._body_paused = True
+        if not self._read_paused:
+            self.transport.pause_reading()
+
+    def _resume_body(self) -> None:
+        self._body_paused = False
+        if not self._read_paused and not self._connection_lost:
+            self.transport.resume_reading()
+
+    def eof_received(self):
+        self._eof = True
+        self._parser.abort(ClientDisconnected())
+        self.reader.feed_eof()
+        self._wakeup()
+        # Keep the write side open so pending responses can still be sent.
+        return self.transport.get_extra_info("sslcontext") is None
+
+    def connection_lost(self, exc) -> None:
+        self._connection_lost = True
+        self._eof = True
+        self._parser.abort(ClientDisconnected())
+        if exc is None:
+            self.reader.feed_eof()
+        else:
+            self.reader.set_exception(exc)
+        self._wakeup()
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                waiter.set_exception(ConnectionResetError("Connection lost"))
+        self._drain_waiters.clear()
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+    def pause_writing(self) -> None:
+        self._write_paused = True
+
+    def resume_writing(self) -> None:
+        self._write_paused = False
+        for waiter in self._drain_waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._drain_waiters.clear()
+
+    def _wakeup(self) -> None:
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def next_request(self):
+        pending = self._pending
+        server = self.server
+        loop = self._loop
+        phase = deadline = None
+        while not pending:
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+            if self._eof:
+                return None
+            current, timeout = server._read_timeout(self._parser, self._served)
+            if current != phase:
+                phase = current
+                deadline = loop.time() + timeout
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return server._timed_out(self._parser)
+            self._waiter = loop.create_future()
+            timer = loop.call_later(remaining, self._wakeup)
+            try:
+                await self._waiter
+            finally:
+                timer.cancel()
+                self._waiter = None
+        self._served += 1
+        request = pending.popleft()
+        if self._read_paused and len(pending) < MAX_PIPELINED // 2:
+            self._read_paused = False
+            if not self._body_paused:
+                self.transport.resume_reading()
+        return request
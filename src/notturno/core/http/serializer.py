@@ -0,0 +1,133 @@
+from http.client import responses
+from typing import Dict, Iterable, List, Tuple
+
+from ...models.headers import Headers
+from ...models.response import Response
+
+_STATUS_LINES: Dict[int, bytes] = {
+    code: f"HTTP/1.1 {code} {reason}\r\n".encode("latin-1")
+    for code, reason in responses.items()
+}
+
+_CONTENT_TYPES: Dict[bytes, bytes] = {
+    content_type.encode("latin-1"): f"Content-Type: {content_type}\r\n".encode(
+        "latin-1"
+    )
+    for content_type in (
+        "application/json",
+        "application/octet-stream",
+        "text/plain",
+        "text/html",
+        "text/plain; charset=utf-8",
+        "text/html; charset=utf-8",
+    )
+}
+
+_CONNECTION = {
+    True: b"Connection: keep-alive\r\n",
+    False: b"Connection: close\r\n",
+}
+
+# Headers the serializer always writes itself.
+_MANAGED_RAW = frozenset((b"server", b"connection", b"transfer-encoding"))
+
+LAST_CHUNK = b"0\r\n\r\n"
+
+
+def encode_chunk(chunk: bytes) -> tuple:
+    """Frames one chunk of a ``Transfer-Encoding: chunked`` body."""
+    return (b"%x\r\n" % len(chunk), chunk, b"\r\n")
+
+
+def status_line(status_code: int) -> bytes:
+    line = _STATUS_LINES.get(status_code)
+    if line is None:
+        line = f"HTTP/1.1 {status_code} UNKNOWN\r\n".encode("latin-1")
+    return line
+
+
+class ResponseSerializer:
+    """Turns responses into wire-format byte chunks for NoctServ.
+
+    The response head is assembled from cached byte fragments and the body
+    is passed through untouched, so callers can hand the result straight to
+    ``writer.writelines``.
+    """
+
+    def __init__(self, server: str = "NoctServ"):
+        self.server_header = f"Server: {server}\r\n".encode("latin-1")
+        self._errors: Dict[tuple, bytes] = {}
+
+    def head(
+        self,
+        status_code: int,
+        headers: Headers | Dict[str, str],
+        content_length: int | None,
+        keep_alive: bool,
+        chunked: bool = False,
+    ) -> bytes:
+        if not isinstance(headers, Headers):
+            headers = Headers(headers)
+        return self.raw_head(
+            status_code, headers.raw, content_length, keep_alive, chunked
+        )
+
+    def raw_head(
+        self,
+        status_code: int,
+        headers: Iterable[Tuple[bytes, bytes]],
+        content_length: int | None,
+        keep_alive: bool,
+        chunked: bool = False,
+    ) -> bytes:
+        """Builds the head from ``(name, value)`` byte pairs, as kept by
+        ``Headers`` or sent by ASGI apps, copying them to the wire without
+        decoding."""
+        parts = [status_line(status_code)]
+        for key, value in headers:
+            lowered = key.lower()
+            if lowered == b"content-type":
+                cached = _CONTENT_TYPES.get(value)
+                if cached is not None:
+                    parts.append(cached)
+                    continue
+            elif lowered == b"content-length":
+                content_length = None
+            elif lowered in _MANAGED_RAW:
+                continue
+            parts += (key, b": ", value, b"\r\n")
+        if content_length is not None:
+            parts.append(b"Content-Length: %d\r\n" % content_length)
+        elif chunked:
+            parts.append(b"Transfer-Encoding: chunked\r\n")
+        parts.append(self.server_header)
+        parts.append(_CONNECTION[keep_alive])
+        parts.append(b"\r\n")
+        return b"".join(parts)
+
+    def serialize(self, resp: Response, keep_alive: bool) -> List[bytes]:
+        """Returns ``[head, body]`` for a response whose body is already bytes."""
+        body = resp.body
+        return [
+            self.head(resp.status_code, resp.headers, len(body), keep_alive),
+            body,
+        ]
+
+    def streaming_head(
+        self, resp: Response, keep_alive: bool, chunked: bool = True
+    ) -> bytes:
+        return self.head(resp.status_code, resp.headers, None, keep_alive, chunked)
+
+    def error(self, status_code: int, keep_alive: bool = False) -> bytes:
+        key = (status_code, keep_alive)
+        cached = self._errors.get(key)
+        if cached is None:
+            body = (responses.get(status_code) or "UNKNOWN").encode("latin-1")
+            cached = (
+                self.head(
+                    status_code, {"Content-Type": "text/plain"}, len(body), keep_alive
+                )
+                + body
+            )
+            self._errors[key] = cached
+        return cached
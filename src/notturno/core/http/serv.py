@@ -1,19 +1,31 @@
 import asyncio
+import signal
+import socket
 import ssl
 import traceback
+from collections import deque
 from functools import partial
-from http.client import responses
-
-from colorama import Fore, Style
-from yarl import URL
+from time import perf_counter
+from urllib.parse import unquote
 
+from ...exceptions import ClientDisconnected, HTTPParseError, WebsocketClosed
 from ...lib import __version__
 from ...logger import logger
 from ...models.request import Request
-from ...models.response import Response
+from ...models.response import FileResponse, StreamingResponse
 from ...models.websocket import WebSocket
-from ...utils import http, jsonenc
-from ...utils.log import stat_color
+from ...utils import http
+from ...types import ENGINE
+from .body import RequestBody
+from .frames import FrameReader
+from .parser import HTTPParser
+from .protocol import NoctProtocol
+from .serializer import LAST_CHUNK, ResponseSerializer, encode_chunk
+
+# How much of a body its handler left unread is read and dropped before
+# the connection closes, and for how long.
+DISCARD_LIMIT = 4 * 1024 * 1024
+DISCARD_TIMEOUT = 5.0
 
 
 class NoctServ:
@@ -21,41 +33,74 @@ class NoctServ:
         self.handler = handler
         self.server_hide = None
         self.connections = {}
-        self.__gen = (
-            self.handler.lifespan(self.handler) if self.handler.lifespan else None
-        )
+        self.serializer = ResponseSerializer()
+        self.keep_alive = True
+        self.keep_alive_timeout = 5.0
+        self.header_timeout = 10.0
+        self.body_timeout = 30.0
+        self.max_requests_per_connection = 1000
+        self.max_connections = None
+        self.max_header_size = 65536
+        self.max_body_size = None
+        self.stream_threshold = 65536
+        self.shutdown_timeout = 30.0
+        self.listener = None
+        self.websockets = set()
+        self.stats = {
+            "accepted": 0,
+            "rejected": 0,
+            "requests": 0,
+            "idle_closed": 0,
+            "drained": 0,
+            "aborted": 0,
+            "websockets_closed": 0,
+            "deflate_bytes": 0,
+            "deflate_wire_bytes": 0,
+        }
+        self.__gen = None
         self.__current = None
+        self._tasks = set()
+        self._draining = False
+        self._stop = None
+        self._exit_task = None
 
-    def parse_http_message(self, http_message):
-        if not http_message.strip():
-            return None, {}, ""
-
-        lines = http_message.splitlines()
-        start_line = lines[0] if lines else ""
-        parts = start_line.split()
+    def _read_timeout(self, parser: HTTPParser, served: int) -> tuple[str, float]:
+        """Returns the read phase of a connection and how long it may take."""
+        if parser.in_body:
+            return ("body", self.body_timeout)
+        if parser.has_partial or not served:
+            return ("header", self.header_timeout)
+        return ("idle", self.keep_alive_timeout)
 
-        if len(parts) < 3:
-            return None, {}, ""
+    def _timed_out(self, parser: HTTPParser) -> None:
+        # Idle connections are closed silently; a half-received request is
+        # answered with 408.
+        if parser.has_partial:
+            raise HTTPParseError("Request Timeout", 408)
+        return None
 
-        method = parts[0]
-        path = parts[1]
-        http_version = parts[2]
-        headers = {}
-        header_lines = []
-
-        for line in lines[1:]:
-            if line == "":
-                break
-            header_lines.append(line)
-
-        for header in header_lines:
-            key, value = header.split(": ", 1)
-            headers[key] = value
-
-        body_start_index = len(header_lines) + 2
-        body = "\n".join(lines[body_start_index:])
+    def _new_parser(self, **body_options) -> HTTPParser:
+        """Creates the parser for one connection. Bodies above
+        ``stream_threshold`` are handed to the handler as a ``RequestBody``
+        created with ``body_options``."""
+        return HTTPParser(
+            self.max_header_size,
+            self.max_body_size,
+            self.stream_threshold,
+            partial(RequestBody, timeout=self.body_timeout, **body_options),
+        )
 
-        return method, path, headers, body, http_version
+    def _should_keep_alive(self, http_version, headers, served):
+        if (
+            not self.keep_alive
+            or self._draining
+            or served >= self.max_requests_per_connection
+        ):
+            return False
+        connection = headers.get("connection", "").lower()
+        if http_version == "HTTP/1.0":
+            return "keep-alive" in connection
+        return "close" not in connection
 
     async def __handle_http(
         self,
@@ -66,93 +111,270 @@ class NoctServ:
         headers,
         body,
         http_version,
-    ):
-        route, params = await self.handler.resolve(method.upper(), path)
-        client_ip, client_port = writer.get_extra_info("peername")
+        keep_alive: bool = False,
+    ) -> bool:
+        access_log = self.handler.access_log
+        started = perf_counter() if access_log.enabled else None
+        route, params = await self.handler.resolve(
+            method.upper(), path.partition("?")[0]
+        )
         if not route:
-            msg = "Not Found"
-            response = (
-                f"HTTP/1.1 404 NotFound\r\n"
-                "Content-Type: text/plain\r\n"
-                f"Content-Length: {len(msg)}\r\n"
-                "\r\n"
-                f"{msg}"
+            keep_alive = keep_alive and not self._draining
+            writer.write(self.serializer.error(404, keep_alive))
+            await writer.drain()
+            if access_log.enabled:
+                access_log.log(
+                    writer.get_extra_info("peername"),
+                    method,
+                    path,
+                    http_version,
+                    404,
+                    started,
+                )
+            return keep_alive
+        req = None
+        if (
+            route.request_arg
+            or route.coalesce_key is not None
+            or self.handler._middleware_chain(route) is not None
+        ):
+            req = Request.from_native(
+                method.upper(),
+                path,
+                headers,
+                body,
+                "https" if self.ssl else "http",
+                params,
             )
-            logger.info(
-                f'{client_ip}:{client_port} - "{Style.BRIGHT}{Fore.WHITE}{method.upper()} {path} HTTP/1.1{Style.RESET_ALL}" {stat_color(404)}404 {responses.get(404)}{Fore.RESET}'
+        if route.coalesce:
+            key = (
+                route.coalesce_key(req)
+                if route.coalesce_key is not None
+                else (
+                    method,
+                    path,
+                    headers.get("authorization"),
+                    headers.get("cookie"),
+                )
             )
-            return response
-        url = URL(f"{'https' if self.ssl else 'http'}://{headers['Host']}/{path}")
-
-        if self.handler.middleware:
-            arg_name = await self.handler._route(func=route, is_type=Request)
-            req = Request(
-                method=method.upper(),
-                url=url,
-                headers=headers,
-                query={key: url.query.getlist(key) for key in url.query.keys()},
-                body=body,
+            resp = await route.coalesced(
+                key, partial(self.handler._dispatch, route, params, req)
             )
-            route = partial(route, **params)
-            resp = await http.wrap_middleware(
-                route,
-                req,
-                http.convert_body,
-                self.handler.middlewares,
-                arg_name,
+        else:
+            resp = await self.handler._dispatch(route, params, req)
+        if self._draining or (body.__class__ is RequestBody and not body.at_eof):
+            # Shutdown may have started while the handler ran.
+            keep_alive = False
+        if isinstance(resp, FileResponse):
+            keep_alive = await self.__send_file(writer, resp, keep_alive)
+        elif isinstance(resp, StreamingResponse):
+            keep_alive = await self.__send_streaming(
+                writer, resp, http_version, keep_alive
             )
         else:
-            arg_name = await self.handler._route(func=route, is_type=Request)
-            if arg_name:
-                req = Request(
-                    method=method.upper(),
-                    url=url,
-                    headers=headers,
-                    query={key: url.query.getlist(key) for key in url.query.keys()},
-                    body=body,
-                )
-                params[arg_name] = req
-            if asyncio.iscoroutinefunction(route):
-                resp = await route(**params)
-            else:
-                resp = route(**params)
-
-        if isinstance(resp, Response):
-            resp = http.convert_body(resp, without_convert=True)
-            resp_desc = responses.get(resp.status_code)
-            if not resp.headers.get("Content-Length"):
-                resp.headers["Content-Length"] = len(resp.body if not isinstance(resp.body, bytes) else resp.body.decode("utf-8"))
-            if not self.server_hide:
-                resp.headers["Server"] = f"NoctServ/{__version__}"
-            else:
-                resp.headers["Server"] = "NoctServ"
-            resp.headers["Connection"] = "close"
-
-            headers = [f"{key}: {value}" for key, value in resp.headers.items()]
-            response = (
-                f"HTTP/1.1 {resp.status_code} {resp_desc if resp_desc else 'UNKNOWN'}\r\n"
-                f"{'\r\n'.join(headers)}\r\n"
-                "\r\n"
-                f"{resp.body}"
+            writer.writelines(self.serializer.serialize(resp, keep_alive))
+            await writer.drain()
+        if access_log.enabled:
+            access_log.log(
+                writer.get_extra_info("peername"),
+                method,
+                path,
+                http_version,
+                resp.status_code,
+                started,
             )
-            status_code = resp.status_code
-        elif isinstance(resp, dict):
-            dumped = jsonenc.dumps(resp)
-            response = (
-                "HTTP/1.1 200 OK\r\n"
-                f"Content-Length: {len(dumped)}\r\n"
-                "Content-Type: application/json\r\n"
-                "\r\n"
-                f"{dumped}"
+        return keep_alive
+
+    async def __handle_asgi(
+        self,
+        writer: asyncio.StreamWriter,
+        method,
+        path,
+        headers,
+        body,
+        http_version,
+        keep_alive: bool,
+    ) -> bool:
+        """Runs one request through the app's ASGI interface, so ASGI
+        middleware added with ``Notturno.add_asgi_middleware`` also applies
+        to NoctServ. Response messages are written to the socket as they
+        are sent."""
+        serializer = self.serializer
+        raw_path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": http_version[5:],
+            "method": method.upper(),
+            "scheme": "https" if self.ssl else "http",
+            "path": unquote(raw_path),
+            "raw_path": raw_path.encode("latin-1"),
+            "query_string": query.encode("latin-1"),
+            "root_path": "",
+            "headers": headers.raw,
+            "client": writer.get_extra_info("peername"),
+            "server": writer.get_extra_info("sockname"),
+        }
+        request_sent = False
+        response_done = asyncio.Event()
+        status_code = response_headers = None
+        streaming = chunked = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                if body.__class__ is RequestBody:
+                    chunk = await body.read()
+                    if chunk:
+                        return {"type": "http.request", "body": chunk, "more_body": True}
+                    request_sent = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status_code, response_headers, streaming, chunked, keep_alive
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = message.get("headers") or []
+                return
+            if message["type"] != "http.response.body" or response_done.is_set():
+                return
+            chunk = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if not streaming:
+                if self._draining or (
+                    body.__class__ is RequestBody and not body.at_eof
+                ):
+                    # The connection closes after the unread body, or
+                    # because the server is shutting down.
+                    keep_alive = False
+                if not more_body:
+                    response_done.set()
+                    writer.writelines(
+                        (
+                            serializer.raw_head(
+                                status_code, response_headers, len(chunk), keep_alive
+                            ),
+                            chunk,
+                        )
+                    )
+                    await writer.drain()
+                    return
+                streaming = True
+                has_length = any(
+                    key.lower() == b"content-length" for key, _ in response_headers
+                )
+                chunked = not has_length and http_version != "HTTP/1.0"
+                if not has_length and not chunked:
+                    keep_alive = False
+                writer.write(
+                    serializer.raw_head(
+                        status_code, response_headers, None, keep_alive, chunked
+                    )
+                )
+            if chunk:
+                if chunked:
+                    writer.writelines(encode_chunk(chunk))
+                else:
+                    writer.write(chunk)
+            if not more_body:
+                response_done.set()
+                if chunked:
+                    writer.write(LAST_CHUNK)
+            await writer.drain()
+
+        try:
+            await self.handler(scope, receive, send)
+        except (HTTPParseError, ClientDisconnected):
+            # Body errors are answered by _serve_connection, unless part of
+            # the response is already out.
+            if streaming or response_done.is_set():
+                return False
+            raise
+        except Exception:
+            # The app already logged the request, so answer without going
+            # through send_error_response.
+            logger.error(
+                "An error occurred while running the application:\n"
+                + traceback.format_exc()
             )
-            status_code = 200
-        writer.write(response.encode("utf-8"))
+            if not streaming and not response_done.is_set():
+                writer.write(serializer.error(500))
+                await writer.drain()
+            return False
+        if status_code is None:
+            raise RuntimeError("ASGI application returned without a response.")
+        if not response_done.is_set():
+            if streaming:
+                return False
+            if self._draining or (body.__class__ is RequestBody and not body.at_eof):
+                keep_alive = False
+            writer.write(serializer.raw_head(status_code, response_headers, 0, keep_alive))
+            await writer.drain()
+        return keep_alive
+
+    async def __send_file(
+        self, writer: asyncio.StreamWriter, resp: FileResponse, keep_alive: bool
+    ) -> bool:
+        writer.write(self.serializer.streaming_head(resp, keep_alive, chunked=False))
         await writer.drain()
-        logger.info(
-            f'{client_ip}:{client_port} - "{Style.BRIGHT}{Fore.WHITE}{method.upper()} {path} HTTP/1.1{Style.RESET_ALL}" {stat_color(status_code)}{status_code} {responses.get(status_code)}{Fore.RESET}'
-        )
-        writer.close()
-        await writer.wait_closed()
+        loop = asyncio.get_running_loop()
+        sendfile = getattr(loop, "sendfile", None)
+        transport = getattr(writer, "transport", None)
+        if sendfile is not None and transport is not None and resp.length:
+            try:
+                with open(resp.path, "rb") as f:
+                    await sendfile(transport, f, resp.offset, resp.length)
+                return keep_alive
+            except NotImplementedError:
+                pass
+            except ConnectionError:
+                return False
+        try:
+            async for chunk in resp:
+                writer.write(chunk)
+                await writer.drain()
+        except ConnectionError:
+            return False
+        return keep_alive
+
+    async def __send_streaming(
+        self,
+        writer: asyncio.StreamWriter,
+        resp: StreamingResponse,
+        http_version,
+        keep_alive: bool,
+    ) -> bool:
+        # HTTP/1.0 clients cannot decode chunked bodies, so the end of the
+        # body is signalled by closing the connection instead.
+        chunked = http_version != "HTTP/1.0" and "Content-Length" not in resp.headers
+        if not chunked and "Content-Length" not in resp.headers:
+            keep_alive = False
+        writer.write(self.serializer.streaming_head(resp, keep_alive, chunked))
+        try:
+            async for chunk in resp:
+                if chunked:
+                    writer.writelines(encode_chunk(chunk))
+                else:
+                    writer.write(chunk)
+                await writer.drain()
+        except ConnectionError:
+            return False
+        except Exception:
+            # The head is already sent, so the only way to signal the error
+            # is to cut the response short.
+            logger.error(
+                "An error occurred while streaming the response:\n"
+                + traceback.format_exc()
+            )
+            return False
+        if chunked:
+            writer.write(LAST_CHUNK)
+            await writer.drain()
+        return keep_alive
 
     async def __native_ws(
         self,
@@ -161,73 +383,234 @@ class NoctServ:
         path,
         headers,
         http_version,
+        initial: bytes = b"",
     ):
-        client_ip, client_port = writer.get_extra_info("peername")
+        access_log = self.handler.access_log
         if "Sec-WebSocket-Key" not in headers:
-            logger.error(
-                f'{client_ip}:{client_port} - "{Style.BRIGHT}{Fore.WHITE}Websocket {path} HTTP/1.1{Style.RESET_ALL}" {stat_color(400)}400 {responses.get(400)}{Fore.RESET}'
-            )
-            return "HTTP/1.1 400 Bad Request\r\nServer: NoctServ\r\n\r\nBad Request"
-        route, params = await self.handler._resolve_internal("WS", path)
+            writer.write(self.serializer.error(400))
+            await writer.drain()
+            if access_log.enabled:
+                access_log.log(
+                    writer.get_extra_info("peername"),
+                    "Websocket",
+                    path,
+                    http_version,
+                    400,
+                    error=True,
+                )
+            return
+        route, params = await self.handler._resolve_internal(
+            "WS", path.partition("?")[0]
+        )
         if not route:
-            msg = "Not Found"
-            response = (
-                f"HTTP/1.1 404 NotFound\r\n"
-                "Content-Type: text/plain\r\n"
-                f"Content-Length: {len(msg)}\r\n"
-                "\r\n"
-                f"{msg}"
-            )
-            writer.write(response.encode("utf-8"))
+            writer.write(self.serializer.error(404))
             await writer.drain()
             writer.close()
-            logger.error(
-                f'{client_ip}:{client_port} - "{Style.BRIGHT}{Fore.WHITE}Websocket {path} HTTP/1.1{Style.RESET_ALL}" {stat_color(404)}404 {responses.get(404)}{Fore.RESET}'
-            )
+            if access_log.enabled:
+                access_log.log(
+                    writer.get_extra_info("peername"),
+                    "Websocket",
+                    path,
+                    http_version,
+                    404,
+                    error=True,
+                )
             return
         ws = WebSocket(path, headers, http_version)
         ws._is_native = True
         ws._webkey = headers.get("Sec-WebSocket-Key")
         ws._reader = reader
         ws._writer = writer
-        ws._logger = logger
-        arg_name = await self.handler._route(func=route, is_type=WebSocket)
-        params[arg_name] = ws
-        if asyncio.iscoroutinefunction(route):
-            await route(**params)
-        else:
-            raise TypeError("Websocket is Only to use in coroutine function.")
+        ws._frames = FrameReader(reader, initial=initial)
+        ws._access_log = access_log
+        if route.request_arg:
+            params[route.request_arg] = ws
+        self.websockets.add(ws)
+        try:
+            await route.call(params)
+            if ws._accepted and not ws._close_sent:
+                # The handler returned without closing the connection.
+                await ws.close()
+        except WebsocketClosed:
+            pass
+        finally:
+            self.websockets.discard(ws)
+            if ws.compression is not None:
+                # Sent message bytes before and after permessage-deflate.
+                self.stats["deflate_bytes"] += ws.compression.stats["sent_bytes"]
+                self.stats["deflate_wire_bytes"] += ws.compression.stats["sent_wire_bytes"]
 
     async def _lifespan(self, shutdown: bool = False):
-        if self.__gen:
+        """Runs the startup half of the lifespan generator, or its shutdown
+        half once startup has run. Each half runs at most once per serve."""
+        if not self.handler.lifespan:
+            return
+        if not shutdown:
+            if self.__gen is not None:
+                return
             self.__gen = self.handler.lifespan(self.handler)
-            if shutdown:
-                try:
-                    await anext(self.__gen)
-                except StopAsyncIteration:
-                    pass
-            else:
-                try:
-                    await anext(self.__gen)
-                except StopAsyncIteration:
-                    pass
+            gen = self.__gen
+        else:
+            gen, self.__gen = self.__gen, None
+            if gen is None:
+                return
+        try:
+            self.__current = await anext(gen)
+        except StopAsyncIteration:
+            pass
 
     async def __handle(
         self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
     ):
+        pending = deque()
+        loop = asyncio.get_running_loop()
+        served = 0
+        failed = None
+
+        async def pull(timeout):
+            # Reads more of a streamed body while its handler waits on it.
+            nonlocal failed
+            try:
+                data = await asyncio.wait_for(reader.read(65536), timeout)
+            except asyncio.TimeoutError:
+                raise HTTPParseError("Request Timeout", 408)
+            except ConnectionError:
+                data = b""
+            if not data:
+                parser.abort(ClientDisconnected())
+                return
+            try:
+                pending.extend(parser.feed(data))
+            except HTTPParseError as e:
+                # Errors in the body itself reach the handler through the
+                # body; this one belongs to a pipelined request after it.
+                failed = e
+
+        parser = self._new_parser(pull=pull)
+
+        async def next_request():
+            nonlocal served, failed
+            if failed is not None and not pending:
+                error, failed = failed, None
+                raise error
+            phase = deadline = None
+            while not pending:
+                current, timeout = self._read_timeout(parser, served)
+                if current != phase:
+                    phase = current
+                    deadline = loop.time() + timeout
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return self._timed_out(parser)
+                try:
+                    data = await asyncio.wait_for(reader.read(65536), remaining)
+                except asyncio.TimeoutError:
+                    continue
+                except ConnectionError:
+                    return None
+                if not data:
+                    return None
+                pending.extend(parser.feed(data))
+            served += 1
+            return pending.popleft()
+
+        await self._serve_connection(
+            reader, writer, next_request, parser.unconsumed
+        )
+
+    async def _serve_connection(self, reader, writer, next_request, unconsumed=None):
+        """Serves the requests returned by ``next_request`` until the
+        connection is done. ``unconsumed`` returns the bytes the parser
+        received after a websocket upgrade when they were not already
+        routed to ``reader``."""
         conn_type = None
+        method = path = None
+        served = 0
+        connections = self.connections
+        stats = self.stats
+        over_limit = (
+            self.max_connections is not None
+            and len(connections) >= self.max_connections
+        )
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        if over_limit:
+            stats["rejected"] += 1
+        else:
+            # Maps each open connection to whether a request is in flight on it.
+            connections[writer] = False
+            stats["accepted"] += 1
         try:
-            data = await reader.read(1024)
-            reqline = data.decode()
-            method, path, headers, body, http_version = self.parse_http_message(reqline)
-            if not headers.get("Upgrade") == "websocket":
-                conn_type = "http"
-                await self.__handle_http(
-                    reader, writer, method, path, headers, body, http_version
-                )
-            else:
-                conn_type = "websocket"
-                await self.__native_ws(writer, reader, path, headers, http_version)
+            if over_limit:
+                # Read the request before answering so that closing the
+                # socket does not reset it with unread data.
+                try:
+                    await next_request()
+                except HTTPParseError:
+                    pass
+                writer.write(self.serializer.error(503))
+                await writer.drain()
+                return
+            while True:
+                try:
+                    request = await next_request()
+                except HTTPParseError as e:
+                    await self.send_error_response(
+                        writer, e.status_code, method or "-", path or "-"
+                    )
+                    break
+                if request is None:
+                    break
+                connections[writer] = True
+                method, path, headers, body, http_version = request
+                served += 1
+                stats["requests"] += 1
+                if headers.get("upgrade", "").lower() != "websocket":
+                    conn_type = "http"
+                    keep_alive = self._should_keep_alive(http_version, headers, served)
+                    if self.handler.asgi_middlewares:
+                        keep_alive = await self.__handle_asgi(
+                            writer, method, path, headers, body, http_version, keep_alive
+                        )
+                    else:
+                        keep_alive = await self.__handle_http(
+                            reader,
+                            writer,
+                            method,
+                            path,
+                            headers,
+                            body,
+                            http_version,
+                            keep_alive,
+                        )
+                    if body.__class__ is RequestBody and not body.at_eof:
+                        # The rest of the body is still on its way, so the
+                        # next request cannot be found in the stream.
+                        await self.__discard(body)
+                        break
+                    if self._draining:
+                        stats["drained"] += 1
+                        break
+                    if not keep_alive:
+                        break
+                    connections[writer] = False
+                else:
+                    conn_type = "websocket"
+                    await self.__native_ws(
+                        writer,
+                        reader,
+                        path,
+                        headers,
+                        http_version,
+                        unconsumed() if unconsumed is not None else b"",
+                    )
+                    break
+        except ClientDisconnected:
+            pass
+        except HTTPParseError as e:
+            # Raised while a handler received a streamed body.
+            if conn_type == "http":
+                await self.send_error_response(writer, e.status_code, method, path)
         except (ssl.SSLError, Exception) as e:
             if isinstance(e, ssl.SSLError):
                 if e.reason == "APPLICATION_DATA_AFTER_CLOSE_NOTIFY":
@@ -245,35 +628,137 @@ class NoctServ:
                 )
                 if conn_type == "http":
                     await self.send_error_response(writer, 500, method, path)
+        finally:
+            connections.pop(writer, None)
+            self._tasks.discard(task)
+            if not writer.is_closing():
+                writer.close()
+            try:
+                await writer.wait_closed()
+            except (ssl.SSLError, ConnectionError):
+                pass
+
+    async def __discard(self, body: RequestBody) -> None:
+        """Reads and drops what the handler left of ``body``, up to
+        ``DISCARD_LIMIT`` bytes. Closing a socket with unread data resets
+        it, and the client can lose the response it has not read yet."""
+        if body.length is not None and body.length - body.received > DISCARD_LIMIT:
+            return
+
+        async def discard():
+            left = DISCARD_LIMIT
+            while left > 0:
+                chunk = await body.read()
+                if not chunk:
+                    return
+                left -= len(chunk)
+
+        try:
+            await asyncio.wait_for(discard(), DISCARD_TIMEOUT)
+        except (asyncio.TimeoutError, HTTPParseError, ClientDisconnected):
+            pass
 
     async def send_error_response(
         self, writer: asyncio.StreamWriter, status_code, method, path
     ):
-        client_ip, client_port = writer.get_extra_info("peername")
-        response = (
-            f"HTTP/1.1 {status_code} {responses.get(status_code)}\r\n"
-            "Content-Type: text/plain\r\n"
-            f"Content-Length: {len(responses.get(status_code))}\r\n"
-            "\r\n"
-            f"{responses.get(status_code)}"
-        )
-        writer.write(response.encode("utf-8"))
+        writer.write(self.serializer.error(status_code))
         await writer.drain()
-        logger.error(
-            f'{client_ip}:{client_port} - "{Style.BRIGHT}{Fore.WHITE}{method.upper()} {path} HTTP/1.1{Style.RESET_ALL}" {stat_color(status_code)}{status_code} {responses.get(status_code)}{Fore.RESET}'
+        access_log = self.handler.access_log
+        if access_log.enabled:
+            access_log.log(
+                writer.get_extra_info("peername"),
+                method,
+                path,
+                "HTTP/1.1",
+                status_code,
+                error=True,
+            )
+
+    def request_shutdown(self) -> None:
+        """Makes a running ``serve`` stop accepting and drain. Safe to call
+        more than once, e.g. from both SIGINT and SIGTERM."""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def graceful_exit(self, timeout: float | None = None):
+        # Every caller (the serve loop, signal fallbacks) shares one drain.
+        if self._exit_task is None:
+            self._exit_task = asyncio.ensure_future(self.__drain(timeout))
+        await asyncio.shield(self._exit_task)
+
+    async def __drain(self, timeout: float | None):
+        timeout = self.shutdown_timeout if timeout is None else timeout
+        stats = self.stats
+        self._draining = True
+        logger.info(
+            f"Shutting down, waiting up to {timeout}s for {len(self.connections)} connections"
+        )
+        if self.listener is not None:
+            self.listener.close()
+        # Keep-alive connections waiting for their next request are closed
+        # right away; busy ones finish their current request and then close
+        # because _should_keep_alive is False while draining.
+        for writer, busy in list(self.connections.items()):
+            if not busy:
+                stats["idle_closed"] += 1
+                writer.close()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        websockets = []
+        for ws in list(self.websockets):
+            if ws._accepted:
+                websockets.append(ws)
+            else:
+                # No handshake response went out, so there is no websocket
+                # to close; the connection is just dropped.
+                ws._writer.close()
+        if websockets:
+            # Close frames go out to every websocket at once, and waiting
+            # for the clients to answer them counts against the deadline.
+            closing = [
+                asyncio.ensure_future(self.__close_websocket(ws)) for ws in websockets
+            ]
+            _, pending = await asyncio.wait(closing, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*closing, return_exceptions=True)
+            stats["websockets_closed"] += len(websockets)
+        tasks = list(self._tasks)
+        if tasks:
+            _, pending = await asyncio.wait(
+                tasks, timeout=max(deadline - loop.time(), 0)
+            )
+            if pending:
+                stats["aborted"] += len(pending)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        await self._lifespan(shutdown=True)
+        if self.listener is not None:
+            await self.listener.wait_closed()
+        logger.info(
+            "Server stopped ({drained} drained, {idle_closed} idle closed, {aborted} aborted, {websockets_closed} websockets closed)".format(
+                **stats
+            )
         )
 
-    async def graceful_exit(self):
-        await self.lifespan_handler()
-        self.listener.close()
-        await self.listener.wait_closed()
+    async def __close_websocket(self, ws: WebSocket) -> None:
+        try:
+            await ws.close(1001, "Server shutting down")
+        except (ssl.SSLError, ConnectionError):
+            pass
 
-    async def lifespan_handler(self):
-        if self.handler.lifespan:
+    def _add_signal_handlers(self, loop: asyncio.AbstractEventLoop) -> list:
+        installed = []
+        for sig in (signal.SIGTERM, signal.SIGINT):
             try:
-                self.__current = await anext(self.__gen)
-            except StopAsyncIteration:
-                pass
+                loop.add_signal_handler(sig, self.request_shutdown)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Windows and non-main threads fall back to the
+                # KeyboardInterrupt handling in Notturno._run_server.
+                continue
+            installed.append(sig)
+        return installed
 
     async def serve(
         self,
@@ -283,23 +768,77 @@ class NoctServ:
         use_ssl: bool = False,
         certfile: str = "cert.pem",
         keyfile: str = "key.pem",
+        keep_alive: bool = True,
+        keep_alive_timeout: float = 5.0,
+        max_requests_per_connection: int = 1000,
+        engine: ENGINE = "streams",
+        sock: socket.socket | None = None,
+        reuse_port: bool = False,
+        header_timeout: float = 10.0,
+        body_timeout: float = 30.0,
+        max_connections: int | None = None,
+        backlog: int = 2048,
+        max_header_size: int = 65536,
+        max_body_size: int | None = None,
+        stream_threshold: int = 65536,
+        shutdown_timeout: float = 30.0,
     ):
         self.server_hide = server_hide
+        self.serializer = ResponseSerializer(
+            "NoctServ" if server_hide else f"NoctServ/{__version__}"
+        )
+        self.keep_alive = keep_alive
+        self.keep_alive_timeout = keep_alive_timeout
+        self.max_requests_per_connection = max_requests_per_connection
+        self.header_timeout = header_timeout
+        self.body_timeout = body_timeout
+        self.max_connections = max_connections
+        self.max_header_size = max_header_size
+        self.max_body_size = max_body_size
+        self.stream_threshold = stream_threshold
+        self.shutdown_timeout = shutdown_timeout
         self.ssl = use_ssl
         self._running = True
-        await self.lifespan_handler()
+        self._draining = False
+        self._exit_task = None
+        self._stop = asyncio.Event()
+        await self._lifespan()
+        ctx = None
         if use_ssl:
             ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
             ctx.load_cert_chain(certfile, keyfile)
             ctx.set_alpn_protocols(["http/1.1"])
-            self.listener = await asyncio.start_server(
-                self.__handle, host, port, ssl=ctx
-            )
             url = f"https://{host}:{port}"
         else:
-            self.listener = await asyncio.start_server(self.__handle, host, port)
             url = f"http://{host}:{port}"
+        if sock is not None:
+            listen = {"sock": sock}
+        else:
+            listen = {
+                "host": host,
+                "port": port,
+                "reuse_port": reuse_port or None,
+                "backlog": backlog,
+            }
+        if engine == "protocol":
+            loop = asyncio.get_running_loop()
+            self.listener = await loop.create_server(
+                partial(NoctProtocol, self), ssl=ctx, **listen
+            )
+        elif engine == "streams":
+            self.listener = await asyncio.start_server(
+                self.__handle, ssl=ctx, **listen
+            )
+        else:
+            raise ValueError(f"Unknown engine: {engine}")
         logger.debug(f"Current using: NoctServ v{__version__}")
         logger.info(f"Server is running on {url}")
-        async with self.listener:
-            await self.listener.serve_forever()
+        loop = asyncio.get_running_loop()
+        signals = self._add_signal_handlers(loop)
+        try:
+            await self._stop.wait()
+            await self.graceful_exit()
+        finally:
+            for sig in signals:
+                loop.remove_signal_handler(sig)
+            self._running = False
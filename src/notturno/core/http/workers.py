@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import platform
+import signal
+import socket
+import time
+
+from ...logger import logger
+
+# A worker that dies sooner than this after starting counts as a failed
+# start. Failed starts are retried after a delay that doubles each time,
+# up to MAX_RESTART_DELAY, and after MAX_FAILED_STARTS in a row the
+# supervisor gives up.
+MIN_UPTIME = 5.0
+FIRST_RESTART_DELAY = 0.5
+MAX_RESTART_DELAY = 30.0
+MAX_FAILED_STARTS = 5
+
+
+def _exit_worker(signum, frame):
+    # Only the first signal starts the graceful exit; later ones (e.g. the
+    # supervisor's SIGTERM after a terminal Ctrl-C) must not interrupt it.
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    raise SystemExit(0)
+
+
+class Supervisor:
+    """Runs the native server in several forked worker processes.
+
+    Every worker runs its own event loop and lifespan. On Linux each worker
+    binds its own listening socket with ``SO_REUSEPORT`` so the kernel
+    spreads connections between them; elsewhere the supervisor binds one
+    socket before forking and the workers share it. Workers that die are
+    restarted, with an increasing delay when they die right after starting,
+    and SIGTERM/SIGINT are forwarded for a graceful shutdown.
+    """
+
+    def __init__(
+        self,
+        app,
+        options: dict,
+        workers: int,
+        reuse_port: bool | None = None,
+        shutdown_timeout: float = 30.0,
+    ):
+        if not hasattr(os, "fork"):
+            raise RuntimeError("workers > 1 requires a platform with os.fork.")
+        self.app = app
+        self.options = dict(options)
+        self.workers = workers
+        self.reuse_port = (
+            platform.system() == "Linux" and hasattr(socket, "SO_REUSEPORT")
+            if reuse_port is None
+            else reuse_port
+        )
+        self.shutdown_timeout = shutdown_timeout
+        self.processes = []
+        self.sock = None
+        self._should_exit = False
+        self._failed = False
+        # Per worker slot: when its process started, how many times in a
+        # row it died right after starting, and when to start it again.
+        self._started = []
+        self._failed_starts = []
+        self._restart_at = []
+        self._context = multiprocessing.get_context("fork")
+
+    def _handle_exit(self, signum, frame):
+        self._should_exit = True
+
+    def _run_worker(self):
+        signal.signal(signal.SIGTERM, _exit_worker)
+        signal.signal(signal.SIGINT, _exit_worker)
+        self.app._run_server(self.options)
+
+    def _spawn(self):
+        process = self._context.Process(target=self._run_worker, daemon=False)
+        process.start()
+        logger.info(f"Started worker process [{process.pid}]")
+        return process
+
+    def _reap(self):
+        for index, process in enumerate(self.processes):
+            if self._should_exit:
+                return
+            now = time.monotonic()
+            restart_at = self._restart_at[index]
+            if restart_at is not None:
+                if now >= restart_at:
+                    self._restart_at[index] = None
+                    self.processes[index] = self._spawn()
+                    self._started[index] = now
+                continue
+            if process.is_alive():
+                continue
+            process.join()
+            if now - self._started[index] >= MIN_UPTIME:
+                self._failed_starts[index] = 0
+                logger.error(
+                    f"Worker process [{process.pid}] died unexpectedly (exit code {process.exitcode}), restarting"
+                )
+                self.processes[index] = self._spawn()
+                self._started[index] = now
+                continue
+            failed_starts = self._failed_starts[index] = self._failed_starts[index] + 1
+            if failed_starts >= MAX_FAILED_STARTS:
+                logger.error(
+                    f"Worker process [{process.pid}] died right after starting {failed_starts} times in a row (exit code {process.exitcode}), giving up"
+                )
+                self._failed = True
+                self._should_exit = True
+                return
+            delay = min(FIRST_RESTART_DELAY * 2 ** (failed_starts - 1), MAX_RESTART_DELAY)
+            logger.error(
+                f"Worker process [{process.pid}] died {now - self._started[index]:.1f}s after starting (exit code {process.exitcode}), restarting in {delay:g}s"
+            )
+            self._restart_at[index] = now + delay
+
+    def _shutdown(self):
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.shutdown_timeout
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.error(
+                    f"Worker process [{process.pid}] did not exit in time, killing"
+                )
+                process.kill()
+                process.join()
+        logger.info("All worker processes stopped")
+
+    def run(self):
+        if self.reuse_port:
+            self.options["reuse_port"] = True
+        else:
+            self.sock = socket.create_server(
+                (self.options["host"], self.options["port"]),
+                backlog=self.options.get("backlog"),
+            )
+            self.sock.set_inheritable(True)
+            self.options["sock"] = self.sock
+
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        logger.info(f"Starting {self.workers} worker processes [{os.getpid()}]")
+        try:
+            for _ in range(self.workers):
+                self.processes.append(self._spawn())
+                self._started.append(time.monotonic())
+                self._failed_starts.append(0)
+                self._restart_at.append(None)
+            while not self._should_exit:
+                self._reap()
+                time.sleep(0.5)
+        finally:
+            self._shutdown()
+            if self.sock:
+                self.sock.close()
+        if self._failed:
+            raise RuntimeError("Worker processes keep dying on startup")
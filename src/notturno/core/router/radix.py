@@ -0,0 +1,175 @@
+from collections import OrderedDict
+
+try:
+    import re2 as re
+except ModuleNotFoundError:
+    import re
+
+
+class _Node:
+    __slots__ = ("static", "patterns", "param", "wildcard", "handlers")
+
+    def __init__(self):
+        self.static = {}
+        self.patterns = []
+        self.param = None
+        self.wildcard = None
+        self.handlers = {}
+
+
+class RadixRouter:
+    """Segment trie router, a drop-in replacement for ``PathRouter``.
+
+    Paths are split on ``/`` and walked one segment at a time, so lookup
+    cost depends on the depth of the path rather than on the number of
+    routes. A segment is either static, ``:name`` (one segment, captured
+    into the params), ``*`` (the rest of the path, or one segment when it
+    is not the last one) or a static/param mix such as ``:id.json``.
+    Static segments are tried before mixed ones, then params, then the
+    wildcard, and the walk backtracks when a branch has no handler for the
+    requested method. Fully static routes skip the trie entirely.
+
+    With ``cache_size`` > 0, the results of ``lookup`` are kept in an LRU
+    of that many ``(method, path)`` entries.
+    """
+
+    def __init__(self, root_path: str = "", cache_size: int = 0):
+        self.root_path = root_path
+        self.patterns = {}
+        self.static_routes = {}
+        self.methods = set()
+        self.cache_size = cache_size
+        self._root = _Node()
+        self._cache = OrderedDict()
+
+    @staticmethod
+    def _split(path: str) -> list:
+        if path in {"/", ""}:
+            return []
+        return path[1:].split("/") if path[0] == "/" else path.split("/")
+
+    def add_route(self, method, pattern, handler):
+        pattern = self.root_path + pattern
+
+        self.patterns.setdefault(method, []).append((pattern, handler))
+        self.methods.add(method)
+        self._cache.clear()
+        if ":" not in pattern and "*" not in pattern:
+            self.static_routes.setdefault(method, {})[
+                "" if pattern == "/" else pattern
+            ] = handler
+            return
+
+        node = self._root
+        names = []
+        for segment in self._split(pattern):
+            if segment == "*":
+                if node.wildcard is None:
+                    node.wildcard = _Node()
+                node = node.wildcard
+                names.append(None)
+            elif segment.startswith(":") and segment[1:].isidentifier():
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+                names.append(segment[1:])
+            elif ":" in segment or "*" in segment:
+                regex = re.sub(r":(\w+)", r"(?P<\1>.+?)", re.escape(segment))
+                regex = regex.replace("\\*", "(.+)")
+                compiled, child = next(
+                    (entry for entry in node.patterns if entry[0].pattern == regex),
+                    (None, None),
+                )
+                if child is None:
+                    compiled, child = re.compile(regex), _Node()
+                    node.patterns.append((compiled, child))
+                group_names = {
+                    index: name for name, index in compiled.groupindex.items()
+                }
+                names.extend(
+                    group_names.get(index) for index in range(1, compiled.groups + 1)
+                )
+                node = child
+            else:
+                node = node.static.setdefault(segment, _Node())
+        node.handlers[method] = (handler, tuple(names))
+
+    def _find(self, node, segments, index, method, values):
+        if index == len(segments):
+            entry = node.handlers.get(method)
+            return (entry, values) if entry is not None else None
+        segment = segments[index]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._find(child, segments, index + 1, method, values)
+            if found is not None:
+                return found
+        for compiled, child in node.patterns:
+            match = compiled.fullmatch(segment)
+            if match is not None:
+                found = self._find(
+                    child, segments, index + 1, method, values + match.groups()
+                )
+                if found is not None:
+                    return found
+        if node.param is not None and segment:
+            found = self._find(
+                node.param, segments, index + 1, method, values + (segment,)
+            )
+            if found is not None:
+                return found
+        wildcard = node.wildcard
+        if wildcard is not None:
+            entry = wildcard.handlers.get(method)
+            rest = "/".join(segments[index:])
+            if entry is not None and rest:
+                return (entry, values + (rest,))
+            if segment and (wildcard.static or wildcard.patterns or wildcard.param):
+                return self._find(
+                    wildcard, segments, index + 1, method, values + (segment,)
+                )
+        return None
+
+    def lookup(self, method, path):
+        """Returns ``(handler, params)`` for ``method`` and ``path``, or
+        ``(None, None)``. The params dict is a fresh copy on every call."""
+        static = self.static_routes.get(method)
+        if static is not None:
+            handler = static.get("" if path == "/" else path)
+            if handler is not None:
+                return (handler, {})
+        cache = self._cache if self.cache_size else None
+        if cache is not None:
+            key = (method, path)
+            cached = cache.get(key)
+            if cached is not None:
+                cache.move_to_end(key)
+                return (cached[0], dict(cached[1]))
+        found = self._find(self._root, self._split(path), 0, method, ())
+        if found is None:
+            return (None, None)
+        (handler, names), values = found
+        params = {name: value for name, value in zip(names, values) if name is not None}
+        if cache is not None:
+            cache[key] = (handler, params)
+            if len(cache) > self.cache_size:
+                cache.popitem(last=False)
+            return (handler, dict(params))
+        return (handler, params)
+
+    def match(self, path):
+        result = {}
+        for method in self.methods:
+            handler, params = self.lookup(method, path)
+            if handler is not None:
+                result[method] = {"func": handler, "params": params}
+        return result or None
+
+    def combine(self, other_router):
+        root_path, self.root_path = self.root_path, ""
+        try:
+            for method, patterns in other_router.patterns.items():
+                for pattern, handler in patterns:
+                    self.add_route(method, pattern, handler)
+        finally:
+            self.root_path = root_path
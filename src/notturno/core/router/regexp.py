@@ -7,6 +7,7 @@ except ModuleNotFoundError:
 class PathRouter:
     def __init__(self, root_path: str = ""):
         self.routes = {}
+        self.patterns = {}
         self.static_routes = {}
         self.root_path = root_path
         self.compiled_regex = {}
@@ -15,6 +16,7 @@ class PathRouter:
     def add_route(self, method, pattern, handler):
         pattern = self.root_path + pattern
 
+        self.patterns.setdefault(method, []).append((pattern, handler))
         if pattern in {"/", ""}:
             self.http_root[method] = {"func": handler, "params": {}}
             return
@@ -56,16 +58,21 @@ class PathRouter:
                             return {
                                 method: {
                                     "func": handler_value,
-                                    "params": {key: match.group(key) for key in match.groupdict() if key}
+                                    "params": {
+                                        key: value
+                                        for key, value in match.groupdict().items()
+                                        if value is not None
+                                        and not key.startswith("route_")
+                                    }
                                 }
                             }
         return None
 
     def combine(self, other_router):
-        for method, routes in other_router.routes.items():
-            for pattern, handler in routes:
-                self.add_route(method, pattern, handler)
-
-        for method, patterns in other_router.static_routes.items():
-            for pattern, handler in patterns.items():
-                self.add_route(method, pattern, handler)
+        root_path, self.root_path = self.root_path, ""
+        try:
+            for method, patterns in other_router.patterns.items():
+                for pattern, handler in patterns:
+                    self.add_route(method, pattern, handler)
+        finally:
+            self.root_path = root_path
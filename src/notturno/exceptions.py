@@ -3,4 +3,17 @@ class NotturnoException(Exception):
 
 
 class WebsocketClosed(NotturnoException):
-    pass
+    def __init__(self, code: int = 1000, reason: str = ""):
+        super().__init__(code, reason)
+        self.code = code
+        self.reason = reason
+
+
+class HTTPParseError(NotturnoException):
+    def __init__(self, message: str = "Bad Request", status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ClientDisconnected(NotturnoException):
+    """The client went away before the whole request body was received."""
@@ -1,4 +1,5 @@
 from .base import BaseMiddleware
-from .cors import CORSMiddleware
+from .cache import CacheMiddleware
+from .cors import CORSASGIMiddleware, CORSMiddleware
 
-__all__ = ["BaseMiddleware", "CORSMiddleware"]
\ No newline at end of file
+__all__ = ["BaseMiddleware", "CacheMiddleware", "CORSMiddleware", "CORSASGIMiddleware"]
@@ -0,0 +1,247 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from .. import Request, Response
+from ..logger import logger
+from .base import BaseMiddleware
+
+
+class _Entry:
+    __slots__ = ("status_code", "headers", "body", "etag", "stored", "expires", "stale_until", "size", "public")
+
+    def __init__(self, status_code, headers, body, etag, stored, expires, stale_until, size, public):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.stored = stored
+        self.expires = expires
+        self.stale_until = stale_until
+        self.size = size
+        self.public = public
+
+
+def _freeze(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _has_credentials(request: Request) -> bool:
+    headers = request.headers
+    return "Authorization" in headers or "Cookie" in headers
+
+
+class CacheMiddleware(BaseMiddleware):
+    """Keeps serialized responses in memory and serves them without
+    calling the handler.
+
+    Add it to the whole app with ``app.add_middleware(CacheMiddleware())``
+    or to single routes with ``@app.get("/", middlewares=[CacheMiddleware(ttl=10)])``.
+    Entries are keyed by method, path, the query params listed in
+    ``query_params`` (all of them when ``None``) and the values of the
+    request headers named in ``vary`` and in the response's ``Vary``.
+    They are fresh for ``ttl`` seconds, then served for up to
+    ``stale_while_revalidate`` more seconds while one background request
+    refreshes them. The cache is an LRU bounded by ``max_size`` bytes.
+
+    Cached responses get an ``ETag`` unless they have one, and a request
+    whose ``If-None-Match`` matches it is answered with 304. Only plain
+    responses with a status in ``statuses`` are stored; streaming
+    responses, ``Set-Cookie``, ``Cache-Control: no-store``/``private`` and
+    ``Vary: *`` are never cached. Responses to requests carrying
+    ``Authorization`` or ``Cookie`` are only stored when the handler marks
+    them ``Cache-Control: public``, and such requests are only served
+    entries that were.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 5.0,
+        stale_while_revalidate: float = 0.0,
+        max_size: int = 32 * 1024 * 1024,
+        query_params: Optional[Iterable[str]] = None,
+        vary: Iterable[str] = (),
+        methods: Iterable[str] = ("GET", "HEAD"),
+        statuses: Iterable[int] = (200,),
+        etag: bool = True,
+    ):
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.max_size = max_size
+        self.query_params = tuple(query_params) if query_params is not None else None
+        self.vary: Tuple[str, ...] = tuple(name.lower() for name in vary)
+        self.methods = frozenset(method.upper() for method in methods)
+        self.statuses = frozenset(statuses)
+        self.etag = etag
+        self.size = 0
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "evictions": 0,
+        }
+        self._entries: OrderedDict[Tuple, _Entry] = OrderedDict()
+        self._vary_names: Dict[Tuple, Tuple[str, ...]] = {}
+        # Number of entries per primary key, so its vary names are dropped
+        # along with its last entry.
+        self._variants: Dict[Tuple, int] = {}
+        self._refreshing: Dict[Tuple, asyncio.Task] = {}
+
+    def _primary_key(self, request: Request) -> Tuple:
+        query = request.query or {}
+        if self.query_params is None:
+            params = tuple(sorted((name, _freeze(value)) for name, value in query.items()))
+        else:
+            params = tuple(_freeze(query.get(name)) for name in self.query_params)
+        return (request.method, request.url.path, params)
+
+    def _key(self, primary: Tuple, request: Request, names: Tuple[str, ...]) -> Tuple:
+        if not names:
+            return (primary, ())
+        headers = request.headers
+        return (primary, tuple(headers.get(name) for name in names))
+
+    async def __call__(self, request: Request, call_next):
+        if request.method not in self.methods:
+            return await call_next(request)
+        primary = self._primary_key(request)
+        key = self._key(primary, request, self._vary_names.get(primary, self.vary))
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and not entry.public and _has_credentials(request):
+            entry = None
+        if entry is not None:
+            if now < entry.expires:
+                self.stats["hits"] += 1
+            elif now < entry.stale_until:
+                self.stats["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing[key] = asyncio.ensure_future(
+                        self._refresh(key, primary, request, call_next)
+                    )
+            else:
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return self._respond(request, entry, now)
+        self.stats["misses"] += 1
+        response = await call_next(request)
+        entry = self._store(primary, request, response, now)
+        if entry is None:
+            return response
+        return self._respond(request, entry, now)
+
+    async def _refresh(self, key: Tuple, primary: Tuple, request: Request, call_next):
+        try:
+            response = await call_next(request)
+            self._store(primary, request, response, time.monotonic())
+        except Exception:
+            logger.exception(f"Failed to revalidate the cached response for {request.url.path}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    def _respond(self, request: Request, entry: _Entry, now: float) -> Response:
+        if entry.etag is not None:
+            if_none_match = request.headers.get("If-None-Match")
+            if if_none_match is not None:
+                tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+                if "*" in tags or entry.etag.removeprefix("W/") in tags:
+                    self.stats["not_modified"] += 1
+                    response = Response(body=b"", headers=entry.headers, status_code=304)
+                    response.headers["Age"] = str(int(now - entry.stored))
+                    return response
+        response = Response(body=entry.body, headers=entry.headers, status_code=entry.status_code)
+        response.headers["Age"] = str(int(now - entry.stored))
+        return response
+
+    def _store(self, primary: Tuple, request: Request, response, now: float) -> Optional[_Entry]:
+        if (
+            type(response) is not Response
+            or response.status_code not in self.statuses
+            or not isinstance(response.body, bytes)
+        ):
+            return None
+        headers = response.headers
+        directives = {
+            directive.split("=", 1)[0].strip()
+            for directive in headers.get("Cache-Control", "").lower().split(",")
+        }
+        if "no-store" in directives or "private" in directives or "Set-Cookie" in headers:
+            return None
+        public = "public" in directives
+        if not public and _has_credentials(request):
+            return None
+        names = self.vary
+        vary = headers.get("Vary")
+        if vary:
+            response_names = tuple(name.strip().lower() for name in vary.split(","))
+            if "*" in response_names:
+                return None
+            names = tuple(dict.fromkeys(names + response_names))
+        key = self._key(primary, request, names)
+
+        headers = headers.copy()
+        headers.pop("Age", None)
+        etag = headers.get("ETag")
+        if etag is None and self.etag:
+            etag = f'"{hashlib.blake2b(response.body, digest_size=8).hexdigest()}"'
+            headers["ETag"] = etag
+        body = response.body
+        size = len(body) + sum(len(k) + len(v) for k, v in headers.raw) + 256
+        if size > self.max_size:
+            return None
+        entry = _Entry(
+            response.status_code,
+            headers,
+            body,
+            etag,
+            now,
+            now + self.ttl,
+            now + self.ttl + self.stale_while_revalidate,
+            size,
+            public,
+        )
+        self._remove(key)
+        self._entries[key] = entry
+        self._vary_names[primary] = names
+        self._variants[primary] = self._variants.get(primary, 0) + 1
+        self.size += size
+        while self.size > self.max_size:
+            self._forget(*self._entries.popitem(last=False))
+            self.stats["evictions"] += 1
+        return entry
+
+    def _remove(self, key: Tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._forget(key, entry)
+
+    def _forget(self, key: Tuple, entry: _Entry) -> None:
+        self.size -= entry.size
+        primary = key[0]
+        remaining = self._variants[primary] - 1
+        if remaining:
+            self._variants[primary] = remaining
+        else:
+            del self._variants[primary]
+            self._vary_names.pop(primary, None)
+
+    def invalidate(self, path: str, method: Optional[str] = None) -> None:
+        """Drops the cached responses for ``path``, for every method or
+        only for ``method``."""
+        for key in [
+            key
+            for key in self._entries
+            if key[0][1] == path and (method is None or key[0][0] == method)
+        ]:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._vary_names.clear()
+        self._variants.clear()
+        self.size = 0
@@ -1,24 +1,227 @@
+try:
+    import re2 as re
+except ModuleNotFoundError:
+    import re
+
 from .. import Request, Response
 from .base import BaseMiddleware
 
+_SAFELISTED_HEADERS = ("Accept", "Accept-Language", "Content-Language", "Content-Type")
+
 
 class CORSMiddleware(BaseMiddleware):
+    """Adds CORS headers and answers preflight requests.
+
+    ``app.add_middleware(CORSMiddleware(...))`` runs it as a regular
+    middleware, where preflights skip the handler but still need a route.
+    ``CORSASGIMiddleware`` applies the same options in front of routing.
+
+    ``allow_origins`` entries are exact origins, ``"*"`` or patterns such
+    as ``"https://*.example.com"``; ``allow_origin_regex`` adds a regular
+    expression. The allowed origin is echoed back (never a list), and
+    ``Vary: Origin`` is added whenever the answer depends on it. All
+    header values are built once here.
+    """
+
     def __init__(
         self,
         allow_origins: list = ["*"],
         allow_methods: list = ["GET", "POST", "OPTIONS"],
         allow_headers: list = ["Content-Type", "Authorization"],
+        allow_credentials: bool = False,
+        allow_origin_regex: str | None = None,
+        expose_headers: list = [],
+        max_age: int = 600,
     ):
-        self.allow_origins = allow_origins
-        self.allow_methods = allow_methods
-        self.allow_headers = allow_headers
+        self.allow_origins = list(allow_origins)
+        self.allow_methods = [method.upper() for method in allow_methods]
+        self.allow_headers = list(allow_headers)
+        self.allow_credentials = allow_credentials
+        self.expose_headers = list(expose_headers)
+        self.max_age = max_age
+
+        self.allow_all_origins = "*" in self.allow_origins
+        self.allow_all_methods = "*" in self.allow_methods
+        self.allow_all_headers = "*" in self.allow_headers
+        self._origins = {
+            origin for origin in self.allow_origins if "*" not in origin
+        }
+        patterns = [
+            re.escape(origin).replace("\\*", "[^.]+")
+            for origin in self.allow_origins
+            if "*" in origin and origin != "*"
+        ]
+        if allow_origin_regex:
+            patterns.append(allow_origin_regex)
+        self._origin_regex = (
+            re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+            if patterns
+            else None
+        )
+        self._allowed_header_names = {
+            name.lower() for name in (*_SAFELISTED_HEADERS, *self.allow_headers)
+        }
+        # With "*" and no credentials the headers do not depend on the
+        # request, so the same value is sent to everyone.
+        self._wildcard = self.allow_all_origins and not allow_credentials
+
+        simple = {}
+        if self._wildcard:
+            simple["Access-Control-Allow-Origin"] = "*"
+        if allow_credentials:
+            simple["Access-Control-Allow-Credentials"] = "true"
+        if self.expose_headers:
+            simple["Access-Control-Expose-Headers"] = ", ".join(self.expose_headers)
+        preflight = dict(simple)
+        preflight.pop("Access-Control-Expose-Headers", None)
+        preflight["Access-Control-Allow-Methods"] = ", ".join(
+            self.allow_methods
+            if not self.allow_all_methods
+            else ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")
+        )
+        if not self.allow_all_headers:
+            preflight["Access-Control-Allow-Headers"] = ", ".join(
+                dict.fromkeys((*_SAFELISTED_HEADERS, *self.allow_headers))
+            )
+        preflight["Access-Control-Max-Age"] = str(max_age)
+        self._simple_headers = simple
+        self._preflight_headers = preflight
+        self._simple_raw = _encode(simple)
+
+    def is_allowed_origin(self, origin: str) -> bool:
+        if self.allow_all_origins or origin in self._origins:
+            return True
+        return (
+            self._origin_regex is not None
+            and self._origin_regex.fullmatch(origin) is not None
+        )
+
+    def _preflight(
+        self, origin: str, method: str, request_headers: str | None
+    ) -> tuple[int, dict]:
+        """Returns the status and headers of a preflight response."""
+        headers = dict(self._preflight_headers)
+        vary = []
+        if not self._wildcard:
+            vary.append("Origin")
+            if not self.is_allowed_origin(origin):
+                return 400, {"Vary": "Origin"}
+            headers["Access-Control-Allow-Origin"] = origin
+        if not self.allow_all_methods and method.upper() not in self.allow_methods:
+            return 400, headers
+        if request_headers:
+            if self.allow_all_headers:
+                headers["Access-Control-Allow-Headers"] = request_headers
+                vary.append("Access-Control-Request-Headers")
+            elif any(
+                name.strip().lower() not in self._allowed_header_names
+                for name in request_headers.split(",")
+                if name.strip()
+            ):
+                return 400, headers
+        if vary:
+            headers["Vary"] = ", ".join(vary)
+        return 204, headers
 
     async def __call__(self, request: Request, call_next):
+        headers = request.headers
+        origin = headers.get("Origin")
+        if request.method == "OPTIONS" and origin is not None:
+            method = headers.get("Access-Control-Request-Method")
+            if method is not None:
+                status_code, preflight = self._preflight(
+                    origin,
+                    method,
+                    headers.get("Access-Control-Request-Headers"),
+                )
+                return Response(body=b"", headers=preflight, status_code=status_code)
         response: Response = await call_next(request)
-        response.headers["Access-Control-Allow-Origin"] = ", ".join(self.allow_origins)
-        response.headers["Access-Control-Allow-Methods"] = ", ".join(self.allow_methods)
-        response.headers["Access-Control-Allow-Headers"] = ", ".join(self.allow_headers)
-        if request.method == "OPTIONS":
-            response.status_code = 204
+        if self._wildcard:
+            response.headers.update(self._simple_headers)
             return response
+        vary = response.headers.get("Vary")
+        response.headers["Vary"] = f"{vary}, Origin" if vary else "Origin"
+        if origin is not None and self.is_allowed_origin(origin):
+            response.headers.update(self._simple_headers)
+            response.headers["Access-Control-Allow-Origin"] = origin
         return response
+
+
+class CORSASGIMiddleware:
+    """``CORSMiddleware`` as ASGI middleware, in front of routing.
+
+    Add it with ``app.add_asgi_middleware(CORSASGIMiddleware, ...)``, with
+    the options of ``CORSMiddleware``. Preflights are answered without
+    resolving a route or calling a handler, which makes this the
+    recommended way to add CORS.
+    """
+
+    def __init__(self, app, **options):
+        self.app = app
+        self.cors = CORSMiddleware(**options)
+
+    async def __call__(self, scope, receive, send):
+        cors = self.cors
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        origin = request_method = request_headers = None
+        for key, value in scope["headers"]:
+            if key == b"origin":
+                origin = value
+            elif key == b"access-control-request-method":
+                request_method = value
+            elif key == b"access-control-request-headers":
+                request_headers = value
+        if (
+            scope["method"] == "OPTIONS"
+            and origin is not None
+            and request_method is not None
+        ):
+            status_code, preflight = cors._preflight(
+                origin.decode("latin-1"),
+                request_method.decode("latin-1"),
+                request_headers.decode("latin-1") if request_headers else None,
+            )
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": status_code,
+                    "headers": _encode(preflight),
+                }
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if cors._wildcard:
+            extra = cors._simple_raw
+        elif origin is not None and cors.is_allowed_origin(origin.decode("latin-1")):
+            extra = [*cors._simple_raw, (b"access-control-allow-origin", origin)]
+        else:
+            extra = ()
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers") or [])
+                headers.extend(extra)
+                if not cors._wildcard:
+                    _add_vary(headers, b"Origin")
+                message["headers"] = headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+def _encode(headers: dict) -> list:
+    return [
+        (key.lower().encode("latin-1"), value.encode("latin-1"))
+        for key, value in headers.items()
+    ]
+
+
+def _add_vary(headers: list, value: bytes) -> None:
+    for index, (key, existing) in enumerate(headers):
+        if key.lower() == b"vary":
+            headers[index] = (key, existing + b", " + value)
+            return
+    headers.append((b"vary", value))
@@ -0,0 +1,198 @@
+from collections.abc import MutableMapping
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+RawHeaders = List[Tuple[bytes, bytes]]
+
+# Header names used in lookups are mostly literals, so their lowercased
+# encodings are memoized.
+_NAMES: Dict[str, bytes] = {}
+
+
+def _encode_name(name: str) -> bytes:
+    key = _NAMES.get(name)
+    if key is None:
+        key = name.lower().encode("latin-1")
+        if len(_NAMES) < 1024:
+            _NAMES[name] = key
+    return key
+
+
+def _encode_value(value: str) -> bytes:
+    # Field values are latin-1 on the wire; anything outside it goes out as
+    # UTF-8, as it did before Headers, rather than failing mid-response.
+    try:
+        return value.encode("latin-1")
+    except UnicodeEncodeError:
+        return value.encode("utf-8")
+
+
+class Headers:
+    """Case-insensitive multidict of HTTP headers.
+
+    The headers live in ``raw``, a list of ``(name, value)`` byte pairs
+    with lowercased names, which is the form ASGI and the native parser
+    already produce and the form sent back to the wire, so nothing is
+    re-encoded on the way in or out. Lookups go through an index of the
+    position of each name, built on the first lookup. Indexing returns
+    the first value of a repeated header; ``getall`` returns all of them,
+    and ``items()`` yields every pair.
+    """
+
+    __slots__ = ("raw", "_index")
+
+    def __init__(
+        self,
+        headers: Union[Mapping[str, str], Iterable[Tuple[str, str]], None] = None,
+        raw: Optional[RawHeaders] = None,
+    ):
+        if raw is not None:
+            self.raw: RawHeaders = raw
+        elif headers is None:
+            self.raw = []
+        elif isinstance(headers, Headers):
+            self.raw = list(headers.raw)
+        else:
+            items = headers.items() if hasattr(headers, "items") else headers
+            self.raw = [
+                (_NAMES.get(key) or _encode_name(key), _encode_value(value))
+                for key, value in items
+            ]
+        self._index: Optional[Dict[bytes, int]] = None
+
+    def _lookup(self) -> Dict[bytes, int]:
+        """Maps each lowercased name to the position of its first value.
+        The index is smaller than ``raw`` exactly when a name repeats."""
+        index = self._index
+        if index is None:
+            index = {}
+            if self.raw:
+                setdefault = index.setdefault
+                for position, (key, _) in enumerate(self.raw):
+                    setdefault(key.lower(), position)
+            self._index = index
+        return index
+
+    def __getitem__(self, name: str) -> str:
+        index = self._index if self._index is not None else self._lookup()
+        position = index.get(_NAMES.get(name) or _encode_name(name))
+        if position is None:
+            raise KeyError(name)
+        return self.raw[position][1].decode("latin-1")
+
+    def get(self, name: str, default=None):
+        index = self._index if self._index is not None else self._lookup()
+        position = index.get(_NAMES.get(name) or _encode_name(name))
+        if position is None:
+            return default
+        return self.raw[position][1].decode("latin-1")
+
+    def getall(self, name: str, default: Optional[List[str]] = None) -> List[str]:
+        key = _encode_name(name)
+        index = self._lookup()
+        if key not in index:
+            return [] if default is None else default
+        if len(index) == len(self.raw):
+            return [self.raw[index[key]][1].decode("latin-1")]
+        return [
+            value.decode("latin-1")
+            for raw_key, value in self.raw
+            if raw_key.lower() == key
+        ]
+
+    def __contains__(self, name) -> bool:
+        index = self._index if self._index is not None else self._lookup()
+        return (_NAMES.get(name) or _encode_name(name)) in index
+
+    def __setitem__(self, name: str, value: str) -> None:
+        key = _NAMES.get(name) or _encode_name(name)
+        pair = (key, _encode_value(value))
+        index = self._index if self._index is not None else self._lookup()
+        raw = self.raw
+        position = index.get(key)
+        if position is None:
+            index[key] = len(raw)
+            raw.append(pair)
+            return
+        if len(index) != len(raw):
+            self.raw = [
+                entry
+                for number, entry in enumerate(raw)
+                if number <= position or entry[0].lower() != key
+            ]
+            self._index = None
+        self.raw[position] = pair
+
+    def __delitem__(self, name: str) -> None:
+        key = _encode_name(name)
+        if key not in self._lookup():
+            raise KeyError(name)
+        self.raw = [entry for entry in self.raw if entry[0].lower() != key]
+        self._index = None
+
+    def add(self, name: str, value: str) -> None:
+        """Appends a value, keeping the ones already set for ``name``."""
+        key = _encode_name(name)
+        self._lookup().setdefault(key, len(self.raw))
+        self.raw.append((key, _encode_value(value)))
+
+    def __iter__(self) -> Iterator[str]:
+        return (key.decode("latin-1") for key in self._lookup())
+
+    def __len__(self) -> int:
+        return len(self._lookup())
+
+    def keys(self) -> List[str]:
+        return [key.decode("latin-1") for key in self._lookup()]
+
+    def items(self) -> List[Tuple[str, str]]:
+        return [
+            (key.decode("latin-1"), value.decode("latin-1")) for key, value in self.raw
+        ]
+
+    def values(self) -> List[str]:
+        return [value.decode("latin-1") for _, value in self.raw]
+
+    def pop(self, name: str, *default):
+        try:
+            value = self[name]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[name]
+        return value
+
+    def setdefault(self, name: str, default: str) -> str:
+        value = self.get(name)
+        if value is None:
+            self[name] = value = default
+        return value
+
+    def update(self, other=(), **kwargs) -> None:
+        items = other.items() if hasattr(other, "items") else other
+        for name, value in items:
+            self[name] = value
+        for name, value in kwargs.items():
+            self[name] = value
+
+    def clear(self) -> None:
+        self.raw = []
+        self._index = None
+
+    def copy(self) -> "Headers":
+        return Headers(raw=list(self.raw))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Headers):
+            return sorted(self.raw) == sorted(other.raw)
+        if isinstance(other, Mapping):
+            return self == Headers(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Headers({self.items()!r})"
+
+
+# Registered rather than inherited: isinstance checks against an ABC
+# subclass are several times slower, and Response creates one per request.
+MutableMapping.register(Headers)
@@ -1,43 +1,259 @@
-from typing import Any, Dict, Optional
+import warnings
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, Dict, Optional
 
 from yarl import URL
 
+from ..exceptions import ClientDisconnected, HTTPParseError
 from ..utils.jsonenc import loads
-from ..utils.multipart import parse_multipart
+from ..utils.multipart import SPOOL_THRESHOLD, parse_multipart
 from ..utils.query import parse_qs
+from .headers import Headers
 
-async def from_asgi(scope: Dict[str, Any], receive: Any):
-    headers = {
-        key.decode("utf-8"): value.decode("utf-8")
-        for key, value in scope["headers"]
-    }
-    response_body = b""
-    while True:
-        message = await receive()
-        response_body += message.get("body", b"")
-        if not message.get("more_body", False):
-            break
-    if scope["method"].lower() == "POST" or scope["method"].lower() == "PUT":
-        if 'multipart/form-data' in headers["content-type"]:
-            response_body = await parse_multipart(scope, receive)
-        else:
-            response_body = response_body.decode("utf-8")
-    else:
-        response_body = response_body.decode("utf-8")
-    return Request(
-        method=scope["method"].upper(),
-        url=URL(f"{scope['scheme']}://{headers['host']}{scope['path']}"),
-        headers=headers,
-        query=parse_qs(scope["query_string"]),
-        body=response_body,
+
+async def from_asgi(scope: Dict[str, Any], receive: Any, max_body_size: Optional[int] = None) -> "Request":
+    """Deprecated: use ``Request.from_asgi``, which does not need to be
+    awaited. The body is no longer received here but when the handler
+    reads it."""
+    warnings.warn(
+        "from_asgi() is deprecated, use Request.from_asgi() instead",
+        DeprecationWarning,
+        stacklevel=2,
     )
+    return Request.from_asgi(scope, receive, max_body_size)
+
 
 class Request:
-    def __init__(self, method: str, url: str | URL, headers: Dict[str, str]={}, query: Dict[str, str]={}, body: Any=""):
+    """An HTTP request.
+
+    Requests built by the servers are lazy: ``headers``, ``query`` and
+    ``url`` are only parsed from the raw request on first access, and on
+    the ASGI path the body is only received when ``body()``, ``text()`` or
+    ``json()`` is awaited. A handler that touches none of them costs one
+    object allocation.
+
+    Large uploads can be consumed without holding them in memory: chunk
+    by chunk with ``async for chunk in request.stream()``, with
+    ``await request.spool()``, which writes the body to a temporary file
+    once it outgrows ``SPOOL_THRESHOLD``, or as a form with
+    ``await request.form()``. Going over ``max_body_size`` raises
+    ``HTTPParseError`` with status 413.
+    """
+
+    __slots__ = (
+        "method",
+        "path_params",
+        "_scheme",
+        "_target",
+        "_url",
+        "_headers",
+        "_query",
+        "_body",
+        "_source",
+        "_spool",
+        "_consumed",
+        "max_body_size",
+        "_scope",
+        "_receive",
+    )
+
+    def __init__(self, method: str, url: str | URL, headers: Dict[str, str] | Headers = {}, query: Optional[Dict[str, str]] = None, body: Any = b"", path_params: Optional[Dict[str, str]] = None):
         self.method: str = method
-        self.url: URL = url if isinstance(url, URL) else URL(url)
-        self.headers: Optional[Dict[str, str]] = headers
-        self.query: Optional[Dict[str, Any]] = query
-        self.body: Optional[Any] = body
+        self.path_params: Dict[str, str] = path_params if path_params is not None else {}
+        self._url: Optional[URL] = url if isinstance(url, URL) else URL(url)
+        self._scheme = self._url.scheme
+        self._target = None
+        self._headers = headers if isinstance(headers, Headers) else Headers(headers)
+        self._query = query
+        self._body = body.encode("utf-8") if isinstance(body, str) else body
+        self._source = None
+        self._spool = None
+        self._consumed = False
+        self.max_body_size = None
+        self._scope = None
+        self._receive = None
+
+    @classmethod
+    def _lazy(cls, method, scheme, target, headers, body, scope=None, receive=None, path_params=None) -> "Request":
+        request = cls.__new__(cls)
+        request.method = method
+        request.path_params = path_params if path_params is not None else {}
+        request._scheme = scheme
+        request._target = target
+        request._url = None
+        request._headers = headers
+        request._query = None
+        if body is None or isinstance(body, bytes):
+            request._body = body
+            request._source = None
+        else:
+            request._body = None
+            request._source = body
+        request._spool = None
+        request._consumed = False
+        request.max_body_size = None
+        request._scope = scope
+        request._receive = receive
+        return request
+
+    @classmethod
+    def from_native(cls, method: str, target: str, headers: Headers, body: Any, scheme: str = "http", path_params: Optional[Dict[str, str]] = None) -> "Request":
+        """Wraps a request parsed by NoctServ; ``target`` is the request
+        target including the query string, and ``body`` either ``bytes`` or
+        the ``RequestBody`` of a body that is still being received."""
+        return cls._lazy(method, scheme, target, headers, body, path_params=path_params)
+
+    @classmethod
+    def from_asgi(cls, scope: Dict[str, Any], receive: Any, max_body_size: Optional[int] = None) -> "Request":
+        """Wraps an ASGI ``http`` scope; the body is received from
+        ``receive`` when it is first read."""
+        request = cls._lazy(
+            scope["method"].upper(),
+            scope.get("scheme", "http"),
+            None,
+            None,
+            None,
+            scope,
+            receive,
+        )
+        request.max_body_size = max_body_size
+        return request
+
+    @property
+    def headers(self) -> Headers:
+        headers = self._headers
+        if headers is None:
+            headers = self._headers = Headers(raw=self._scope["headers"])
+        return headers
+
+    def _host(self) -> str:
+        host = self.headers.get("host")
+        if host is None and self._scope is not None and self._scope.get("server"):
+            address, port = self._scope["server"][:2]
+            host = f"{address}:{port}"
+        return host or "localhost"
+
+    @property
+    def url(self) -> URL:
+        url = self._url
+        if url is None:
+            target = self._target
+            if target is None:
+                scope = self._scope
+                target = scope["path"]
+                if scope.get("query_string"):
+                    target = f"{target}?{scope['query_string'].decode('latin-1')}"
+            url = self._url = URL(f"{self._scheme}://{self._host()}{target}")
+        return url
+
+    @property
+    def query(self) -> Dict[str, str]:
+        query = self._query
+        if query is None:
+            if self._target is not None:
+                query_string = self._target.partition("?")[2]
+            elif self._scope is not None:
+                query_string = self._scope.get("query_string", b"")
+            else:
+                query_string = self._url.raw_query_string
+            query = self._query = parse_qs(query_string) if query_string else {}
+        return query
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Yields the request body in chunks as it is received.
+
+        The chunks are not kept, so a body that was streamed cannot be read
+        again with ``body()``; one that was already read or spooled is
+        replayed from memory or from its file.
+        """
+        if self._body is not None:
+            if self._body:
+                yield self._body
+            return
+        if self._spool is not None:
+            file = self._spool
+            file.seek(0)
+            while True:
+                chunk = file.read(65536)
+                if not chunk:
+                    break
+                yield chunk
+            file.seek(0)
+            return
+        if self._consumed:
+            raise RuntimeError("The request body has already been consumed.")
+        self._consumed = True
+        limit = self.max_body_size
+        received = 0
+        if self._source is not None:
+            read = self._source.read
+            while True:
+                chunk = await read()
+                if not chunk:
+                    return
+                received += len(chunk)
+                if limit is not None and received > limit:
+                    raise HTTPParseError("Payload Too Large", 413)
+                yield chunk
+        if self._receive is None:
+            return
+        receive = self._receive
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ClientDisconnected()
+            chunk = message.get("body")
+            if chunk:
+                received += len(chunk)
+                if limit is not None and received > limit:
+                    raise HTTPParseError("Payload Too Large", 413)
+                yield chunk
+            if not message.get("more_body", False):
+                return
+
+    async def body(self) -> bytes:
+        """Returns the whole request body, receiving it first if needed."""
+        body = self._body
+        if body is None:
+            if self._spool is not None:
+                file = self._spool
+                file.seek(0)
+                body = self._body = file.read()
+                file.seek(0)
+                return body
+            chunks = []
+            async for chunk in self.stream():
+                chunks.append(chunk)
+            body = self._body = b"".join(chunks)
+        return body
+
+    async def spool(self, max_memory: int = SPOOL_THRESHOLD) -> SpooledTemporaryFile:
+        """Receives the whole body into a ``SpooledTemporaryFile`` that
+        stays in memory up to ``max_memory`` bytes and is rewound before
+        being returned. Later calls return the same file."""
+        file = self._spool
+        if file is None:
+            file = SpooledTemporaryFile(max_size=max_memory)
+            try:
+                async for chunk in self.stream():
+                    file.write(chunk)
+            except BaseException:
+                file.close()
+                raise
+            file.seek(0)
+            self._spool = file
+        return file
+
+    async def text(self, encoding: str = "utf-8") -> str:
+        return (await self.body()).decode(encoding)
+
+    async def json(self) -> Any:
+        return loads(await self.body())
 
-    def json(self) -> dict: return loads(self.body).decode("utf-8")
\ No newline at end of file
+    async def form(self, **limits) -> Dict[str, Any]:
+        """Parses a ``multipart/form-data`` or urlencoded body. Multipart
+        bodies are parsed as they are received, with file parts written to
+        ``UploadFile``s; ``limits`` are passed to ``MultipartStream``."""
+        if self.headers.get("content-type", "").startswith("multipart/form-data"):
+            return await parse_multipart(self, **limits)
+        return parse_qs(await self.body())
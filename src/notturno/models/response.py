@@ -1,8 +1,65 @@
-from typing import Optional, Dict, Any, Union
+import asyncio
+import os
+from typing import Optional, Dict, Any, AsyncIterable, AsyncIterator, Iterable, Union
+
+from .headers import Headers
 
 class Response:
-    def __init__(self, body: Optional[Union[Dict[str, Any], Any, str, bytes]]="", headers: Dict[str, str] = {}, status_code: int = 200, content_type: Union[str, None] = None):
+    def __init__(self, body: Optional[Union[Dict[str, Any], Any, str, bytes]]="", headers: Optional[Dict[str, str]] = None, status_code: int = 200, content_type: Union[str, None] = None):
         self.body: Optional[Union[Dict[str, Any], Any, str, bytes]]= body
-        self.headers: Dict[str, str] = headers
+        self.headers: Headers = Headers(headers)
         self.status_code: Optional[int] = status_code
-        self.content_type: Union[str, None] = content_type
\ No newline at end of file
+        self.content_type: Union[str, None] = content_type
+
+class StreamingResponse(Response):
+    """A response whose body is produced piece by piece.
+
+    ``content`` may be a sync iterable, an async iterable or an async
+    generator yielding ``bytes`` or ``str`` chunks. The chunks are sent as
+    they are produced instead of being joined in memory first.
+    """
+
+    def __init__(self, content: Union[Iterable[Union[str, bytes]], AsyncIterable[Union[str, bytes]]], headers: Optional[Dict[str, str]] = None, status_code: int = 200, content_type: Union[str, None] = None):
+        super().__init__(body=b"", headers=headers, status_code=status_code, content_type=content_type)
+        self.content = content
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        if hasattr(self.content, "__aiter__"):
+            async for chunk in self.content:
+                if chunk:
+                    yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+        else:
+            for chunk in self.content:
+                if chunk:
+                    yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+class FileResponse(StreamingResponse):
+    """Streams ``length`` bytes of a file starting at ``offset``.
+
+    NoctServ sends it with ``loop.sendfile`` when the transport supports it;
+    otherwise, and on the ASGI path, the file is read in ``chunk_size``
+    pieces off the event loop.
+    """
+
+    def __init__(self, path: str, headers: Optional[Dict[str, str]] = None, status_code: int = 200, content_type: Union[str, None] = None, offset: int = 0, length: Optional[int] = None, chunk_size: int = 65536):
+        if length is None:
+            length = os.stat(path).st_size - offset
+        super().__init__(self.__read(), headers=headers, status_code=status_code, content_type=content_type)
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.chunk_size = chunk_size
+        self.headers["Content-Length"] = str(length)
+
+    async def __read(self) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await loop.run_in_executor(None, f.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
@@ -1,33 +1,80 @@
 import asyncio
 import base64
 import hashlib
-import struct
-from http.client import responses
-
-from colorama import Fore, Style
 
+from ..core.http.deflate import Deflate, PerMessageDeflate
+from ..core.http.frames import (
+    CLOSE_ABNORMAL,
+    CLOSE_INVALID_DATA,
+    CLOSE_NO_STATUS,
+    CLOSE_PROTOCOL_ERROR,
+    CLOSE_TOO_BIG,
+    OP_BINARY,
+    OP_CLOSE,
+    OP_CONTINUATION,
+    OP_PING,
+    OP_PONG,
+    OP_TEXT,
+    RSV1,
+    FrameError,
+    FrameReader,
+    close_payload,
+    frame_header,
+    parse_close,
+)
 from ..exceptions import WebsocketClosed
-from ..utils.log import stat_color
+
+# How long close() waits for the client to answer the close frame.
+CLOSE_TIMEOUT = 5.0
+
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+# Compression offered by default to clients that ask for it.
+DEFAULT_COMPRESSION = PerMessageDeflate()
 
 
 class WebSocket:
-    def __init__(self, path: str, headers: str, http_version: str):
+    """A websocket connection, on NoctServ or behind an ASGI server.
+
+    On NoctServ, ``recv`` reassembles fragmented messages, answers pings
+    and completes the close handshake by itself, as ASGI servers do on
+    their side. On both, text messages are returned as ``str`` and binary
+    ones as ``bytes``, and messages larger than ``max_message_size`` close
+    the connection with 1009. Once the connection is closed, ``recv`` and
+    ``send`` raise ``WebsocketClosed`` carrying the close code.
+
+    ``accept`` negotiates ``permessage-deflate`` when the client offers
+    it; ``compression`` is then the connection's ``Deflate`` codec, whose
+    ``stats`` and ``ratio`` show how much it saves.
+    """
+
+    def __init__(self, path: str, headers: str, http_version: str, max_message_size: int | None = MAX_MESSAGE_SIZE):
         self._webkey = None
         self._reader: asyncio.StreamReader = None
         self._writer: asyncio.StreamWriter = None
+        self._frames: FrameReader = None
         self._is_native = True
 
         self.path = path
         self.headers = headers
         self.http_version = http_version
+        self.max_message_size = max_message_size
+        self.close_code = None
+        self.close_reason = ""
+        self.compression: Deflate | None = None
 
         self._send = None
         self._receive = None
-        self._logger = None
+        self._access_log = None
+        self._accepted = False
+        self._close_sent = False
+        self._reading = False
+        self._closed = asyncio.Event()
 
-    async def accept(self):
+    async def accept(self, compression: PerMessageDeflate | None = DEFAULT_COMPRESSION):
+        """Completes the handshake. Pass ``compression=None`` to refuse
+        ``permessage-deflate``, or a ``PerMessageDeflate`` to tune it."""
         if self._is_native:
-            client_ip, client_port = self._writer.get_extra_info("peername")
             webaccept = base64.b64encode(
                 hashlib.sha1(
                     (self._webkey + "258EAFA5-E914-47DA-95CA-C5AB0DC85B11").encode()
@@ -38,91 +85,233 @@ class WebSocket:
                 b"Upgrade: websocket\r\n",
                 b"Connection: Upgrade\r\n",
                 b"Sec-WebSocket-Accept: " + webaccept + b"\r\n",
-                b"Sec-WebSocket-Version: 13\r\n\r\n",
             ]
-            if self._logger:
-                self._logger.info(
-                    f'{client_ip}:{client_port} - "{Style.BRIGHT}{Fore.WHITE}Websocket (Accepted) {self.path} HTTP/1.1{Style.RESET_ALL}" {stat_color(101)}101 {responses.get(101)}{Fore.RESET}'
+            if self._frames is None:
+                self._frames = FrameReader(self._reader)
+            if compression is not None:
+                negotiated = compression.negotiate(
+                    self.headers.get("Sec-WebSocket-Extensions")
+                )
+                if negotiated is not None:
+                    extension, self.compression = negotiated
+                    self._frames.rsv_allowed = RSV1
+                    response_headers.append(
+                        b"Sec-WebSocket-Extensions: "
+                        + extension.encode("latin-1")
+                        + b"\r\n"
+                    )
+            response_headers.append(b"Sec-WebSocket-Version: 13\r\n\r\n")
+            access_log = self._access_log
+            if access_log is not None and access_log.enabled:
+                access_log.log(
+                    self._writer.get_extra_info("peername"),
+                    "Websocket (Accepted)",
+                    self.path,
+                    self.http_version,
+                    101,
                 )
             self._writer.write(b"".join(response_headers))
             await self._writer.drain()
+            self._accepted = True
         else:
+            # ASGI servers negotiate extensions themselves.
             await self._send(
                 {
                     "type": "websocket.accept",
                 }
             )
+            self._accepted = True
 
     async def recv(self):
         if self._is_native:
-            data = await self._reader.read(2)
-            if len(data) < 2:
-                raise WebsocketClosed
-
-            length = data[1] & 127
-            if length == 126:
-                length_data = await self._reader.read(2)
-                length = struct.unpack(">H", length_data)[0]
-            elif length == 127:
-                length_data = await self._reader.read(8)
-                length = struct.unpack(">Q", length_data)[0]
-
-            mask = await self._reader.read(4)
-
-            message = await self._reader.read(length)
-
-            decoded_message = bytearray(b ^ mask[i % 4] for i, b in enumerate(message))
-
+            if self.close_code is not None:
+                raise WebsocketClosed(self.close_code, self.close_reason)
+            if self._frames is None:
+                self._frames = FrameReader(self._reader)
+            self._reading = True
             try:
-                return decoded_message.decode()
-            except UnicodeDecodeError:
-                return None
+                return await self.__read_message()
+            except FrameError as e:
+                await self.__fail(e.code, e.reason)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                self.__finish(CLOSE_ABNORMAL, "")
+                raise WebsocketClosed(self.close_code, self.close_reason)
+            finally:
+                self._reading = False
         else:
+            if self.close_code is not None:
+                raise WebsocketClosed(self.close_code, self.close_reason)
             message = await self._receive()
             if message["type"] == "websocket.disconnect":
-                raise WebsocketClosed
+                self.close_code = message.get("code", CLOSE_NO_STATUS)
+                self.close_reason = message.get("reason") or ""
+                raise WebsocketClosed(self.close_code, self.close_reason)
             elif message["type"] == "websocket.receive":
-                return message["text"]
+                data = message.get("text")
+                if data is None:
+                    data = message.get("bytes", b"")
+                limit = self.max_message_size
+                if limit is not None and len(data) > limit:
+                    await self.close(CLOSE_TOO_BIG, "Message too big")
+                    raise WebsocketClosed(CLOSE_TOO_BIG, "Message too big")
+                return data
             raise Exception("Invalid message type")
 
-    def __create_websocket_frame(self, message):
-        byte_message = message.encode("utf-8") if isinstance(message, str) else message
-        if not byte_message:
-            raise WebsocketClosed
-        length = len(byte_message)
-        if length <= 125:
-            frame = bytearray([0b10000001]) + bytearray([length]) + byte_message
-        elif length >= 126 and length <= 65535:
-            frame = (
-                bytearray([0b10000001])
-                + bytearray([126])
-                + bytearray(length.to_bytes(2, "big"))
-                + byte_message
-            )
-        else:
-            raise Exception("Message too long")
-        return frame
+    async def __read_message(self):
+        frames = self._frames
+        limit = self.max_message_size
+        opcode = None
+        compressed = 0
+        parts = []
+        size = 0
+        while True:
+            frames.max_size = None if limit is None else limit - size
+            fin, frame_opcode, rsv, payload = await frames.read_frame()
+            if frame_opcode >= OP_CLOSE:
+                if rsv:
+                    raise FrameError(CLOSE_PROTOCOL_ERROR, "Compressed control frame")
+                await self.__control(frame_opcode, payload)
+                continue
+            if frame_opcode == OP_CONTINUATION:
+                if opcode is None:
+                    raise FrameError(CLOSE_PROTOCOL_ERROR, "Unexpected continuation frame")
+                if rsv:
+                    raise FrameError(CLOSE_PROTOCOL_ERROR, "RSV1 set on a continuation frame")
+            elif opcode is not None:
+                raise FrameError(CLOSE_PROTOCOL_ERROR, "Expected a continuation frame")
+            else:
+                opcode = frame_opcode
+                compressed = rsv
+            size += len(payload)
+            if not fin:
+                parts.append(payload)
+                continue
+            if parts:
+                parts.append(payload)
+                payload = b"".join(parts)
+            if compressed:
+                payload = self.compression.decompress(payload, limit)
+            if opcode == OP_TEXT:
+                try:
+                    return payload.decode("utf-8")
+                except UnicodeDecodeError:
+                    raise FrameError(CLOSE_INVALID_DATA, "Invalid UTF-8 in text message")
+            return payload
+
+    async def __control(self, opcode: int, payload: bytes) -> None:
+        if opcode == OP_PING:
+            if not self._close_sent:
+                await self.__write_frame(OP_PONG, payload)
+        elif opcode == OP_CLOSE:
+            code, reason = parse_close(payload)
+            if not self._close_sent:
+                # Echo the code to complete the close handshake.
+                self._close_sent = True
+                try:
+                    await self.__write_frame(OP_CLOSE, close_payload(code))
+                except ConnectionError:
+                    pass
+            self.__finish(code, reason)
+            raise WebsocketClosed(code, reason)
+
+    async def __write_frame(self, opcode: int, payload: bytes, rsv1: bool = False) -> None:
+        self._writer.writelines((frame_header(opcode, len(payload), True, rsv1), payload))
+        await self._writer.drain()
+
+    async def __fail(self, code: int, reason: str):
+        if not self._close_sent:
+            self._close_sent = True
+            try:
+                await self.__write_frame(OP_CLOSE, close_payload(code, reason))
+            except ConnectionError:
+                pass
+        self.__finish(code, reason)
+        raise WebsocketClosed(code, reason)
+
+    def __finish(self, code: int, reason: str) -> None:
+        if self.close_code is None:
+            self.close_code = code
+            self.close_reason = reason
+        self._closed.set()
+        self._writer.close()
 
     async def send(self, message: str | bytes):
         if self._is_native:
-            self._writer.write(self.__create_websocket_frame(message))
-            await self._writer.drain()
+            if self._close_sent or self.close_code is not None:
+                raise WebsocketClosed(self.close_code or CLOSE_ABNORMAL, self.close_reason)
+            if isinstance(message, str):
+                opcode, message = OP_TEXT, message.encode("utf-8")
+            else:
+                opcode = OP_BINARY
+            compressed = None
+            if self.compression is not None:
+                compressed = self.compression.compress(message)
+            try:
+                if compressed is not None:
+                    await self.__write_frame(opcode, compressed, True)
+                else:
+                    await self.__write_frame(opcode, message)
+            except ConnectionError:
+                self.__finish(CLOSE_ABNORMAL, "")
+                raise WebsocketClosed(self.close_code, self.close_reason)
         else:
+            if self._close_sent or self.close_code is not None:
+                raise WebsocketClosed(self.close_code or CLOSE_ABNORMAL, self.close_reason)
             tmpl = {
                 "type": "websocket.send",
             }
-            if isinstance(message, bytes):
-                tmpl["bytes"] = message
-            else:
+            if isinstance(message, str):
                 tmpl["text"] = message
-            await self._send(tmpl)
+            else:
+                tmpl["bytes"] = bytes(message)
+            try:
+                await self._send(tmpl)
+            except OSError:
+                # ASGI servers raise an OSError once the client is gone.
+                self.close_code = CLOSE_ABNORMAL
+                raise WebsocketClosed(CLOSE_ABNORMAL)
 
-    async def close(self):
+    async def close(self, code: int = 1000, reason: str = ""):
         if self._is_native:
+            if not self._close_sent and not self._writer.is_closing():
+                self._close_sent = True
+                try:
+                    await self.__write_frame(OP_CLOSE, close_payload(code, reason))
+                except ConnectionError:
+                    pass
+                else:
+                    await self.__wait_close()
+            if self.close_code is None:
+                self.close_code = code
+                self.close_reason = reason
+            self._closed.set()
             self._writer.close()
-        else:
-            await self._send(
-                {
-                    "type": "websocket.close",
-                }
-            )
+        elif not self._close_sent and self.close_code is None:
+            self._close_sent = True
+            try:
+                await self._send(
+                    {
+                        "type": "websocket.close",
+                        "code": code,
+                        "reason": reason,
+                    }
+                )
+            except OSError:
+                pass
+            self.close_code = code
+            self.close_reason = reason
+
+    async def __wait_close(self) -> None:
+        # Wait for the client's close frame. If a handler is blocked in
+        # recv() it will read it; otherwise read and drop messages here.
+        try:
+            if self._reading:
+                await asyncio.wait_for(self._closed.wait(), CLOSE_TIMEOUT)
+                return
+            await asyncio.wait_for(self.__discard_until_close(), CLOSE_TIMEOUT)
+        except (WebsocketClosed, asyncio.TimeoutError):
+            pass
+
+    async def __discard_until_close(self) -> None:
+        while True:
+            await self.recv()
@@ -0,0 +1,256 @@
+import asyncio
+import mimetypes
+import os
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from stat import S_ISDIR, S_ISREG
+from typing import Dict, Optional, Tuple
+
+from .gear import Gear
+from .models.headers import Headers
+from .models.request import Request
+from .models.response import FileResponse, Response
+
+
+class StaticFiles(Gear):
+    """Serves files below ``directory`` under ``root_path``.
+
+    Mount it with ``app.merge(StaticFiles("/static", "public"))``. Files
+    answer conditional requests (``ETag``/``Last-Modified``), single byte
+    ranges and serve a precompressed ``.gz`` sibling to clients accepting
+    gzip. ``HEAD`` requests get the headers of the ``GET`` response. Files up to ``max_cached_file_size`` are kept in memory as their
+    finished headers and body, in an LRU cache bounded by
+    ``max_cache_size`` bytes; larger files are streamed, with ``sendfile``
+    on the native server. The disk is only touched in the executor.
+    """
+
+    def __init__(
+        self,
+        root_path: str,
+        directory: str,
+        index: str | None = "index.html",
+        gzip: bool = True,
+        max_cache_size: int = 16 * 1024 * 1024,
+        max_cached_file_size: int = 256 * 1024,
+        chunk_size: int = 65536,
+    ):
+        super().__init__(root_path=root_path.rstrip("/"))
+        self.directory = os.path.realpath(directory)
+        self.index = index
+        self.gzip = gzip
+        self.max_cache_size = max_cache_size
+        self.max_cached_file_size = max_cached_file_size
+        self.chunk_size = chunk_size
+        # Finished responses of small files: raw headers, body and content
+        # type, keyed by the file and its stat so a changed file misses.
+        self._cache: OrderedDict[Tuple, Tuple[Headers, bytes, str]] = OrderedDict()
+        self._cache_size = 0
+        self._prefix = self._router.root_path
+
+        async def static_files(request: Request):
+            return await self.serve_file(request)
+
+        self.route("/*", method=["GET", "HEAD"])(static_files)
+        # "/*" needs a segment after the prefix, so the mount root gets
+        # routes of its own. Routes lose their trailing slash, so the
+        # handler is also added to the router under "/" as is.
+        self.route("", method=["GET", "HEAD"])(static_files)
+        for method in ("GET", "HEAD"):
+            root, _ = self._router.lookup(method, self._prefix)
+            self._router.add_route(method, "/", root)
+
+    @staticmethod
+    def _accepts_gzip(accept_encoding: str) -> bool:
+        """Whether ``Accept-Encoding`` allows gzip, by name or through
+        ``*``, with a non-zero q-value."""
+        qualities = {}
+        for item in accept_encoding.split(","):
+            coding, _, params = item.partition(";")
+            coding = coding.strip().lower()
+            if not coding:
+                continue
+            quality = 1.0
+            for param in params.split(";"):
+                name, _, value = param.partition("=")
+                if name.strip().lower() == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            qualities[coding] = quality
+        quality = qualities.get("gzip", qualities.get("x-gzip"))
+        if quality is None:
+            quality = qualities.get("*", 0.0)
+        return quality > 0
+
+    def _find(
+        self, relative: str, gzip: bool
+    ) -> Optional[Tuple[str, str, os.stat_result]]:
+        """Returns the requested path, the path of the file to send (its
+        ``.gz`` sibling when ``gzip`` allows it) and that file's stat.
+        Touches the disk, so it runs in the executor."""
+        path = os.path.realpath(os.path.join(self.directory, relative))
+        if path != self.directory and not path.startswith(self.directory + os.sep):
+            return None
+        try:
+            stat = os.stat(path)
+            if S_ISDIR(stat.st_mode):
+                if not self.index:
+                    return None
+                path = os.path.join(path, self.index)
+                stat = os.stat(path)
+        except OSError:
+            return None
+        if not S_ISREG(stat.st_mode):
+            return None
+        if gzip:
+            try:
+                compressed = os.stat(path + ".gz")
+            except OSError:
+                pass
+            else:
+                if S_ISREG(compressed.st_mode):
+                    return path, path + ".gz", compressed
+        return path, path, stat
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _store(self, key: Tuple, entry: Tuple[Headers, bytes, str]) -> None:
+        self._cache[key] = entry
+        self._cache_size += len(entry[1])
+        while self._cache_size > self.max_cache_size:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_size -= len(evicted[1])
+
+    def _not_modified(self, request: Request, etag: str, mtime: float) -> bool:
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or etag in tags
+        if_modified_since = request.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def _range(self, request: Request, etag: str, size: int):
+        """Returns ``None`` for a full response, ``(start, end)`` for a
+        satisfiable single range and ``False`` for an unsatisfiable one."""
+        range_header = request.headers.get("Range")
+        if not range_header or not range_header.startswith("bytes="):
+            return None
+        if_range = request.headers.get("If-Range")
+        if if_range is not None and if_range != etag:
+            return None
+        spec = range_header[6:].strip()
+        if "," in spec:
+            # Multipart ranges are not supported; send the whole file.
+            return None
+        start, sep, end = spec.partition("-")
+        try:
+            if not start:
+                length = int(end)
+                if length <= 0:
+                    return False
+                return (max(0, size - length), size - 1)
+            start = int(start)
+            end = int(end) if end else size - 1
+        except ValueError:
+            return None
+        if start >= size or end < start:
+            return False
+        return (start, min(end, size - 1))
+
+    @staticmethod
+    def _head(
+        headers, content_type: str, length: int, status_code: int = 200
+    ) -> Response:
+        # The headers of the GET response, without its body.
+        response = Response(
+            body=b"", headers=headers, status_code=status_code, content_type=content_type
+        )
+        response.headers["Content-Length"] = str(length)
+        return response
+
+    async def serve_file(self, request: Request) -> Response:
+        loop = asyncio.get_running_loop()
+        head = request.method == "HEAD"
+        gzip = False
+        if self.gzip:
+            accept_encoding = request.headers.get("Accept-Encoding")
+            gzip = (
+                bool(accept_encoding)
+                and not request.headers.get("Range")
+                and self._accepts_gzip(accept_encoding)
+            )
+        relative = request.url.path[len(self._prefix) :].lstrip("/")
+        found = await loop.run_in_executor(None, self._find, relative, gzip)
+        if found is None:
+            return Response(body="Not Found", status_code=404)
+        path, file_path, stat = found
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+        key = (file_path, stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.get(key)
+        if cached is not None and not request.headers.get("Range"):
+            self._cache.move_to_end(key)
+            headers, body, content_type = cached
+            if self._not_modified(request, etag, stat.st_mtime):
+                return Response(body=b"", headers=headers, status_code=304)
+            if head:
+                return self._head(headers, content_type, len(body))
+            return Response(body=body, headers=headers, content_type=content_type)
+
+        headers: Dict[str, str] = {"Accept-Ranges": "bytes"}
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or "application/octet-stream"
+        if self.gzip:
+            headers["Vary"] = "Accept-Encoding"
+            if file_path != path:
+                headers["Content-Encoding"] = "gzip"
+        headers["ETag"] = etag
+        headers["Last-Modified"] = formatdate(stat.st_mtime, usegmt=True)
+
+        if self._not_modified(request, etag, stat.st_mtime):
+            return Response(body=b"", headers=headers, status_code=304)
+
+        size = stat.st_size
+        byte_range = self._range(request, etag, size)
+        if byte_range is False:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(body=b"", headers=headers, status_code=416)
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            if head:
+                return self._head(headers, content_type, end - start + 1, 206)
+            return FileResponse(
+                file_path,
+                headers=headers,
+                status_code=206,
+                content_type=content_type,
+                offset=start,
+                length=end - start + 1,
+                chunk_size=self.chunk_size,
+            )
+
+        if head:
+            return self._head(headers, content_type, size)
+        if size <= self.max_cached_file_size:
+            body = await loop.run_in_executor(None, self._read, file_path)
+            if len(body) == size:
+                self._store(key, (Headers(headers), body, content_type))
+            return Response(body=body, headers=headers, content_type=content_type)
+        return FileResponse(
+            file_path,
+            headers=headers,
+            content_type=content_type,
+            length=size,
+            chunk_size=self.chunk_size,
+        )
@@ -1,3 +1,5 @@
 from typing import Literal
 
 LOOP = Literal["none", "auto", "asyncio", "uvloop", "winloop"]
+ENGINE = Literal["streams", "protocol"]
+ACCESS_LOG = Literal["color", "compact", "json"]
@@ -1,7 +1,7 @@
-import asyncio
-from functools import partial
+import warnings
 
 from . import jsonenc
+from ..core.handler import HandlerPlan
 from ..models.response import Response
 from ..models.request import Request
 
@@ -15,7 +15,7 @@ content_type_map = {
 }
 
 
-def convert_body(resp, without_convert: bool = False):
+def convert_body(resp):
     if isinstance(resp, Response):
         if isinstance(resp.body, (dict, list)):
             resp.body = (
@@ -26,15 +26,12 @@ def convert_body(resp, without_convert: bool = False):
             content_type = content_type_map[dict]
         elif isinstance(resp.body, (str, bytes)):
             content_type = content_type_map[type(resp.body)]
-            if without_convert:
-                resp.body = resp.body.decode("utf-8")
-            else:
-                resp.body = resp.body.encode("utf-8") if isinstance(resp.body, str) else resp.body
+            if isinstance(resp.body, str):
+                resp.body = resp.body.encode("utf-8")
+        elif isinstance(resp.body, (bytearray, memoryview)):
+            content_type = content_type_map[bytes]
         elif isinstance(resp.body, (int, float)):
-            if without_convert:
-                resp.body = str(resp.body)
-            else:
-                resp.body = str(resp.body).encode("utf-8")
+            resp.body = str(resp.body).encode("utf-8")
             content_type = content_type_map[int]
         else:
             content_type = "application/octet-stream"
@@ -55,23 +52,44 @@ def convert_body(resp, without_convert: bool = False):
     return resp
 
 
-async def wrap_middleware(
-    route, req: Request, convert_response, middlewares=[], arg_name: str = None
-):
-    async def call_next(request):
-        if asyncio.iscoroutinefunction(route):
-            if arg_name:
-                return convert_response(await route(**{arg_name: request}))
-            else:
-                return convert_response(await route())
-        else:
-            if arg_name:
-                return convert_response(route(**{arg_name: request}))
-            else:
-                return convert_response(route())
+def _bind_middleware(middleware, call_next):
+    async def call(request: Request):
+        return await middleware(request, call_next=call_next)
+
+    return call
+
+
+def compose_middleware(route, convert_response, middlewares=()):
+    """Builds the middleware chain for one route once.
 
+    The returned coroutine function takes the ``Request`` (with the path
+    params in ``request.path_params``) and returns the converted response.
+    """
+    request_arg = route.request_arg
+
+    async def endpoint(request: Request):
+        kwargs = dict(request.path_params)
+        if request_arg:
+            kwargs[request_arg] = request
+        return convert_response(await route.call(kwargs))
+
+    call_next = endpoint
     for middleware in reversed(middlewares):
-        call_next = partial(middleware, call_next=call_next)
+        call_next = _bind_middleware(middleware, call_next)
+    return call_next
+
 
-    resp = await call_next(req)
-    return resp
\ No newline at end of file
+async def wrap_middleware(
+    route, req: Request, convert_response, middlewares=[], arg_name: str = None
+):
+    """Deprecated: runs ``req`` through ``middlewares`` and ``route``,
+    building the chain on every call. Use ``compose_middleware`` to build
+    it once per route."""
+    warnings.warn(
+        "wrap_middleware() is deprecated, use compose_middleware() instead",
+        DeprecationWarning,
+        stacklevel=2,
+    )
+    plan = HandlerPlan(route, Request)
+    plan.request_arg = arg_name
+    return await compose_middleware(plan, convert_response, middlewares)(req)
@@ -3,18 +3,15 @@ from colorama import Fore
 
 colorama.init(autoreset=True)
 
+# Keyed by the status class (status_code // 100).
 status_colors = {
-    range(100, 200): Fore.CYAN,
-    range(200, 300): Fore.GREEN,
-    range(300, 400): Fore.YELLOW,
-    range(400, 500): Fore.RED,
-    range(500, 600): Fore.MAGENTA,
+    1: Fore.CYAN,
+    2: Fore.GREEN,
+    3: Fore.YELLOW,
+    4: Fore.RED,
+    5: Fore.MAGENTA,
 }
 
 
 def stat_color(status_code):
-    color = Fore.WHITE
-    for code_range, code_color in status_colors.items():
-        if status_code in code_range:
-            color = code_color
-    return color
+    return status_colors.get(status_code // 100, Fore.WHITE)
@@ -1,42 +1,235 @@
-from typing import Any, Dict
+import shutil
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple
 
-from multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
 
+from ..exceptions import HTTPParseError
 
-async def read_body(scope: Dict[str, Any], receive: Any):
-    body = bytearray()
-    while True:
-        message = await receive()
-        if message.get("type") == "http.request":
-            body.extend(message.get("body", b""))
-            if not message.get("more_body", False):
-                break
-    return bytes(body)
+# File parts stay in memory up to this size, then move to a temporary file.
+SPOOL_THRESHOLD = 1024 * 1024
 
 
-def get_boundary(scope: Dict[str, Any]):
-    content_type = dict(scope["headers"]).get(b"content-type", b"").decode("latin-1")
-    if "boundary=" in content_type:
-        return content_type.split("boundary=")[1].strip()
-    return ""
+class UploadFile:
+    """A file received in a multipart form.
 
+    The content is written to ``file``, a ``SpooledTemporaryFile`` that
+    moves to disk once it holds more than ``max_memory`` bytes, and is
+    rewound when the part is complete.
+    """
 
-async def parse_multipart(scope: Dict[str, Any], receive: Any) -> dict:
-    body = await read_body(scope, receive)
+    __slots__ = ("name", "filename", "content_type", "headers", "size", "file")
 
-    boundary = get_boundary(scope)
+    def __init__(
+        self,
+        name: str,
+        filename: str,
+        content_type: Optional[str],
+        headers: List[Tuple[bytes, bytes]],
+        max_memory: int = SPOOL_THRESHOLD,
+    ):
+        self.name = name
+        self.filename = filename
+        self.content_type = content_type
+        self.headers = headers
+        self.size = 0
+        self.file = SpooledTemporaryFile(max_size=max_memory)
 
-    parser = MultipartParser(body, boundary)
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
 
-    form_data = {}
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.file.seek(offset, whence)
 
-    for part in parser.parts:
-        if part.filename:
-            form_data[part.name] = {
-                "filename": part.filename,
-                "content_type": part.content_type,
-                "content": part.file.read(),
-            }
+    def save(self, path: str) -> None:
+        """Copies the content to ``path`` without loading it in memory."""
+        self.file.seek(0)
+        with open(path, "wb") as out:
+            shutil.copyfileobj(self.file, out)
+        self.file.seek(0)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __repr__(self) -> str:
+        return f"UploadFile(name={self.name!r}, filename={self.filename!r}, size={self.size})"
+
+
+def get_boundary(headers: Mapping[str, str]) -> bytes:
+    content_type = headers.get("content-type", "")
+    mime, options = parse_options_header(content_type)
+    if mime != b"multipart/form-data":
+        return b""
+    return options.get(b"boundary", b"")
+
+
+class MultipartStream:
+    """Incremental ``multipart/form-data`` parser.
+
+    Body chunks are pushed with ``feed`` as they are received, and every
+    part completed by a chunk is returned as a ``(name, value)`` pair,
+    where ``value`` is a ``str`` for plain fields and an ``UploadFile`` for
+    file parts. File content is written out as it arrives, so memory use
+    is bounded by the chunk size and ``max_memory`` however large the
+    upload is.
+
+    ``max_file_size`` and ``max_field_size`` bound single parts and
+    ``max_parts`` their number; going over any of them raises
+    ``HTTPParseError`` with status 413.
+    """
+
+    def __init__(
+        self,
+        boundary: bytes | str,
+        max_memory: int = SPOOL_THRESHOLD,
+        max_file_size: Optional[int] = None,
+        max_field_size: int = 1024 * 1024,
+        max_parts: int = 1000,
+    ):
+        self.max_memory = max_memory
+        self.max_file_size = max_file_size
+        self.max_field_size = max_field_size
+        self.max_parts = max_parts
+        self.parts = 0
+        self.finished = False
+        self._completed: List[Tuple[str, Any]] = []
+        self._headers: List[Tuple[bytes, bytes]] = []
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._name = ""
+        self._file: Optional[UploadFile] = None
+        self._field = bytearray()
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_end": self._on_end,
+            },
+        )
+
+    def _on_part_begin(self) -> None:
+        self._headers = []
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers.append(
+            (bytes(self._header_field).lower(), bytes(self._header_value))
+        )
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self) -> None:
+        self.parts += 1
+        if self.parts > self.max_parts:
+            raise HTTPParseError("Too many multipart parts", 413)
+        disposition = content_type = None
+        for key, value in self._headers:
+            if key == b"content-disposition":
+                disposition = value
+            elif key == b"content-type":
+                content_type = value.decode("latin-1")
+        if disposition is None:
+            raise HTTPParseError("Missing Content-Disposition in multipart part")
+        _, options = parse_options_header(disposition)
+        self._name = options.get(b"name", b"").decode("utf-8", "replace")
+        filename = options.get(b"filename")
+        if filename is not None:
+            self._file = UploadFile(
+                self._name,
+                filename.decode("utf-8", "replace"),
+                content_type,
+                self._headers,
+                self.max_memory,
+            )
         else:
-            form_data[part.name] = part.text
-    return form_data
+            self._file = None
+            self._field.clear()
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        upload = self._file
+        if upload is None:
+            if len(self._field) + end - start > self.max_field_size:
+                raise HTTPParseError("Multipart field too large", 413)
+            self._field += data[start:end]
+            return
+        upload.size += end - start
+        if self.max_file_size is not None and upload.size > self.max_file_size:
+            raise HTTPParseError("Uploaded file too large", 413)
+        upload.file.write(data[start:end])
+
+    def _on_part_end(self) -> None:
+        upload = self._file
+        if upload is None:
+            self._completed.append((self._name, self._field.decode("utf-8", "replace")))
+            return
+        upload.file.seek(0)
+        self._completed.append((self._name, upload))
+        self._file = None
+
+    def _on_end(self) -> None:
+        self.finished = True
+
+    def feed(self, data: bytes) -> List[Tuple[str, Any]]:
+        """Parses the next chunk of the body and returns the parts it
+        completed."""
+        try:
+            self._parser.write(data)
+        except MultipartParseError:
+            self.abort()
+            raise HTTPParseError("Invalid multipart body")
+        except BaseException:
+            self.abort()
+            raise
+        completed, self._completed = self._completed, []
+        return completed
+
+    def close(self) -> None:
+        """Checks that the closing boundary was received."""
+        if not self.finished:
+            self.abort()
+            raise HTTPParseError("Incomplete multipart body")
+
+    def abort(self) -> None:
+        """Releases the file of the part being received, if any."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+async def iter_multipart(request: Any, **limits) -> AsyncIterator[Tuple[str, Any]]:
+    """Yields the ``(name, value)`` parts of a ``multipart/form-data``
+    request as each one is completed; ``limits`` are passed to
+    ``MultipartStream``."""
+    boundary = get_boundary(request.headers)
+    if not boundary:
+        raise HTTPParseError("Missing multipart boundary")
+    parser = MultipartStream(boundary, **limits)
+    try:
+        async for chunk in request.stream():
+            for part in parser.feed(chunk):
+                yield part
+    except BaseException:
+        parser.abort()
+        raise
+    parser.close()
+
+
+async def parse_multipart(request: Any, **limits) -> Dict[str, Any]:
+    """Receives a whole ``multipart/form-data`` body and maps each field
+    name to its value; a repeated name keeps its last value."""
+    form = {}
+    async for name, value in iter_multipart(request, **limits):
+        form[name] = value
+    return form
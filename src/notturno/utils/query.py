@@ -5,9 +5,18 @@ try:
 except ModuleNotFoundError:
     parse_query_string = None
 
-def parse_qs(qs: str) -> dict[str, str]:
+def parse_qs(qs: str | bytes) -> dict[str, str]:
     if parse_query_string:
+        # fast_query_parsers only takes bytes; request targets are decoded
+        # as latin-1, so this gives back the bytes that were received.
+        if isinstance(qs, str):
+            try:
+                qs = qs.encode("latin-1")
+            except UnicodeEncodeError:
+                qs = qs.encode("utf-8")
         query = dict(parse_query_string(qs, "&"))
     else:
+        if isinstance(qs, bytes):
+            qs = qs.decode("latin-1")
         query = dict(parse_qsl(qs))
     return query
\ No newline at end of file
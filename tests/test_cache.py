@@ -0,0 +1,72 @@
+import asyncio
+
+from notturno import Notturno, Request, Response
+from notturno.middleware import CacheMiddleware
+
+
+def call(app, path, headers=()):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"test")]
+        + [(key.encode(), value.encode()) for key, value in headers],
+        "http_version": "1.1",
+        "scheme": "http",
+        "client": ("127.0.0.1", 1),
+        "server": ("test", 80),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return b"".join(message.get("body", b"") for message in sent[1:])
+
+
+def make_app(cache_control=None):
+    app = Notturno()
+    calls = []
+
+    @app.get("/me")
+    async def me(request: Request):
+        calls.append(request)
+        user = request.headers.get("Authorization") or request.headers.get("Cookie") or "anonymous"
+        headers = {"Cache-Control": cache_control} if cache_control else {}
+        return Response(body=user.encode(), headers=headers)
+
+    app.add_middleware(CacheMiddleware(ttl=60))
+    return app, calls
+
+
+def test_credentialed_responses_are_not_shared():
+    app, calls = make_app()
+    assert call(app, "/me", [("Authorization", "Bearer alice")]) == b"Bearer alice"
+    assert call(app, "/me", [("Cookie", "session=bob")]) == b"session=bob"
+    assert call(app, "/me") == b"anonymous"
+    assert len(calls) == 3
+    # The anonymous entry is not served to credentialed requests either.
+    assert call(app, "/me", [("Authorization", "Bearer alice")]) == b"Bearer alice"
+    assert call(app, "/me") == b"anonymous"
+    assert len(calls) == 4
+
+
+def test_public_responses_are_shared():
+    app, calls = make_app("public, max-age=60")
+    assert call(app, "/me", [("Authorization", "Bearer alice")]) == b"Bearer alice"
+    assert call(app, "/me") == b"Bearer alice"
+    assert len(calls) == 1
+
+
+def test_private_and_no_store_are_not_cached():
+    for cache_control in ("private", "no-store", "public, no-store"):
+        app, calls = make_app(cache_control)
+        call(app, "/me")
+        call(app, "/me")
+        assert len(calls) == 2
@@ -0,0 +1,96 @@
+import asyncio
+
+from notturno import Notturno
+from notturno.middleware import CORSASGIMiddleware, CORSMiddleware
+
+
+def call(app, method, path, headers=()):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"test")]
+        + [(key.encode(), value.encode()) for key, value in headers],
+        "http_version": "1.1",
+        "scheme": "http",
+        "client": ("127.0.0.1", 1),
+        "server": ("test", 80),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    return start["status"], {
+        key.decode(): value.decode() for key, value in start["headers"]
+    }
+
+
+def make_app(**options):
+    app = Notturno()
+
+    @app.route("/items", method=["GET", "OPTIONS"])
+    async def items():
+        return "items"
+
+    app.add_middleware(CORSMiddleware(**options))
+    return app
+
+
+def test_positional_origins():
+    cors = CORSMiddleware(["https://a.example"])
+    assert cors.is_allowed_origin("https://a.example")
+    assert not cors.is_allowed_origin("https://b.example")
+
+
+def test_preflight_through_middleware():
+    app = make_app(allow_origins=["https://a.example"], allow_methods=["GET", "PUT"])
+    status, headers = call(
+        app,
+        "OPTIONS",
+        "/items",
+        [("origin", "https://a.example"), ("access-control-request-method", "PUT")],
+    )
+    assert status == 204
+    assert headers["access-control-allow-origin"] == "https://a.example"
+    assert "PUT" in headers["access-control-allow-methods"]
+    assert "Origin" in headers["vary"]
+
+
+def test_preflight_rejected_origin_through_middleware():
+    app = make_app(allow_origins=["https://a.example"])
+    status, headers = call(
+        app,
+        "OPTIONS",
+        "/items",
+        [("origin", "https://evil.example"), ("access-control-request-method", "GET")],
+    )
+    assert status == 400
+    assert "access-control-allow-origin" not in headers
+
+
+def test_simple_request_through_middleware():
+    app = make_app(allow_origins=["https://a.example"])
+    status, headers = call(app, "GET", "/items", [("origin", "https://a.example")])
+    assert status == 200
+    assert headers["access-control-allow-origin"] == "https://a.example"
+
+
+def test_preflight_through_asgi_middleware():
+    app = Notturno()
+    app.add_asgi_middleware(CORSASGIMiddleware, allow_origins=["https://*.example"])
+    status, headers = call(
+        app,
+        "OPTIONS",
+        "/unrouted",
+        [("origin", "https://a.example"), ("access-control-request-method", "GET")],
+    )
+    assert status == 204
+    assert headers["access-control-allow-origin"] == "https://a.example"
@@ -0,0 +1,44 @@
+import asyncio
+from functools import wraps
+
+from notturno import Notturno
+from notturno.core.handler import HandlerPlan
+from notturno.models.request import Request
+
+
+def test_inject_wrapper_is_skipped():
+    app = Notturno()
+    app.dependencies["db"] = "database"
+
+    @app.inject("db")
+    async def handler(db):
+        return db
+
+    plan = HandlerPlan(handler, Request)
+    assert plan.handler is handler.__wrapped__
+    assert plan.dependencies == ("db",)
+    assert asyncio.run(plan.call({})) == "database"
+
+
+def test_decorator_above_inject_is_called():
+    app = Notturno()
+    app.dependencies["db"] = "database"
+    calls = []
+
+    def auth(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            calls.append("auth")
+            return await func(*args, **kwargs)
+
+        return wrapper
+
+    @auth
+    @app.inject("db")
+    async def handler(db):
+        return db
+
+    plan = HandlerPlan(handler, Request)
+    assert plan.handler is handler
+    assert asyncio.run(plan.call({})) == "database"
+    assert calls == ["auth"]
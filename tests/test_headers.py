@@ -0,0 +1,16 @@
+from notturno.models.headers import Headers
+
+
+def test_values_outside_latin1_are_sent_as_utf8():
+    headers = Headers({"Content-Disposition": "attachment; filename=\"café.txt\""})
+    headers["X-Title"] = "夜想曲"
+    headers.add("X-Title", "\U0001f319")
+    assert dict(headers.raw)[b"content-disposition"] == b'attachment; filename="caf\xe9.txt"'
+    assert headers.raw[1] == (b"x-title", "夜想曲".encode("utf-8"))
+    assert headers.raw[2] == (b"x-title", "\U0001f319".encode("utf-8"))
+
+
+def test_lookup_is_case_insensitive():
+    headers = Headers([("Set-Cookie", "a=1"), ("set-cookie", "b=2")])
+    assert headers["SET-COOKIE"] == "a=1"
+    assert headers.getall("Set-Cookie") == ["a=1", "b=2"]
@@ -0,0 +1,79 @@
+import pytest
+
+from notturno.core.http.parser import HTTPParser
+from notturno.exceptions import HTTPParseError
+
+
+def parse(data: bytes, **options):
+    return HTTPParser(**options).feed(data)
+
+
+def chunked(body: bytes, extra_headers: bytes = b"") -> bytes:
+    return (
+        b"POST / HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n"
+        + extra_headers
+        + b"\r\n"
+        + body
+    )
+
+
+def test_chunked_body():
+    [(_, _, _, body, _)] = parse(chunked(b"5\r\nhello\r\n6;ext=1\r\n world\r\n0\r\n\r\n"))
+    assert body == b"hello world"
+
+
+def test_chunked_trailers_are_skipped():
+    [(_, _, _, body, _)] = parse(chunked(b"2\r\nhi\r\n0\r\nX-Sum: 1\r\n\r\n"))
+    assert body == b"hi"
+
+
+@pytest.mark.parametrize("size", [b"0x2", b"+2", b"0_2", b" 2", b"2 ", b"-2", b""])
+def test_chunk_size_must_be_hex_digits(size):
+    with pytest.raises(HTTPParseError) as e:
+        parse(chunked(size + b"\r\nhi\r\n0\r\n\r\n"))
+    assert e.value.status_code == 400
+
+
+def test_trailers_are_limited():
+    parser = HTTPParser(max_header_size=1024)
+    parser.feed(chunked(b"2\r\nhi\r\n0\r\n"))
+    with pytest.raises(HTTPParseError) as e:
+        for _ in range(100):
+            parser.feed(b"X-Pad: " + b"a" * 50 + b"\r\n")
+    assert e.value.status_code == 431
+
+
+def test_unterminated_trailer_line_is_limited():
+    parser = HTTPParser(max_header_size=1024)
+    parser.feed(chunked(b"0\r\n"))
+    with pytest.raises(HTTPParseError) as e:
+        parser.feed(b"X" * 2048)
+    assert e.value.status_code == 431
+
+
+def test_transfer_encoding_with_content_length_is_rejected():
+    with pytest.raises(HTTPParseError) as e:
+        parse(chunked(b"0\r\n\r\n", b"Content-Length: 5\r\n"))
+    assert e.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "coding, status",
+    [(b"gzip, chunked", 501), (b"gzip", 400), (b"chunked, identity", 400), (b"xchunked", 400)],
+)
+def test_unsupported_transfer_encodings(coding, status):
+    with pytest.raises(HTTPParseError) as e:
+        parse(b"POST / HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: " + coding + b"\r\n\r\n0\r\n\r\n")
+    assert e.value.status_code == status
+
+
+@pytest.mark.parametrize("value", ["²".encode("latin-1"), b"1_0", b"+1", b" "])
+def test_invalid_content_length(value):
+    with pytest.raises(HTTPParseError) as e:
+        parse(b"POST / HTTP/1.1\r\nHost: x\r\nContent-Length: " + value + b"\r\n\r\n")
+    assert e.value.status_code == 400
+
+
+def test_conflicting_content_lengths():
+    with pytest.raises(HTTPParseError):
+        parse(b"POST / HTTP/1.1\r\nContent-Length: 1\r\nContent-Length: 2\r\n\r\nab")
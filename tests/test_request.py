@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from notturno.models.request import Request, from_asgi
+
+SCOPE = {
+    "type": "http",
+    "method": "post",
+    "scheme": "http",
+    "path": "/items",
+    "query_string": b"a=1",
+    "headers": [(b"host", b"test"), (b"content-type", b"application/json")],
+}
+
+
+def receiver(*chunks):
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": index < len(chunks) - 1}
+        for index, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    return receive
+
+
+def test_from_asgi_reads_the_body_lazily():
+    async def main():
+        request = Request.from_asgi(SCOPE, receiver(b'{"a": ', b"1}"))
+        assert request.method == "POST"
+        assert str(request.url) == "http://test/items?a=1"
+        assert await request.json() == {"a": 1}
+        assert await request.text() == '{"a": 1}'
+
+    asyncio.run(main())
+
+
+def test_awaiting_module_from_asgi_is_deprecated():
+    async def main():
+        with pytest.warns(DeprecationWarning):
+            request = await from_asgi(SCOPE, receiver(b"hi"))
+        assert await request.body() == b"hi"
+
+    asyncio.run(main())
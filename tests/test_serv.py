@@ -0,0 +1,112 @@
+import asyncio
+import socket
+
+import pytest
+
+from notturno import Notturno
+
+
+def make_app(asgi_middleware=False):
+    app = Notturno()
+
+    @app.post("/ignore")
+    async def ignore():
+        return "ok"
+
+    if asgi_middleware:
+        app.add_asgi_middleware(lambda inner: inner)
+    return app
+
+
+async def request(app, engine, data):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = asyncio.ensure_future(app.http.serve(sock=sock, engine=engine))
+    while app.http.listener is None:
+        await asyncio.sleep(0.01)
+    try:
+        reader, writer = await asyncio.open_connection(*sock.getsockname())
+        writer.write(data)
+        response = await asyncio.wait_for(reader.read(), 10)
+        writer.close()
+        return response
+    finally:
+        app.http.request_shutdown()
+        await server
+
+
+@pytest.mark.parametrize("engine", ["streams", "protocol"])
+@pytest.mark.parametrize("asgi_middleware", [False, True])
+def test_response_survives_unread_body(engine, asgi_middleware):
+    body = b"x" * (2 * 1024 * 1024)
+    data = (
+        b"POST /ignore HTTP/1.1\r\nHost: test\r\nContent-Length: "
+        + str(len(body)).encode()
+        + b"\r\n\r\n"
+        + body
+    )
+    response = asyncio.run(request(make_app(asgi_middleware), engine, data))
+    head, _, content = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200")
+    assert b"connection: close" in head.lower()
+    assert content == b"ok"
+
+
+async def drain_with(app, engine, data):
+    # Sends ``data``, starts shutting down while the handler runs and
+    # returns everything the server wrote before closing.
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = asyncio.ensure_future(
+        app.http.serve(sock=sock, engine=engine, shutdown_timeout=1)
+    )
+    while app.http.listener is None:
+        await asyncio.sleep(0.01)
+    reader, writer = await asyncio.open_connection(*sock.getsockname())
+    writer.write(data)
+    await asyncio.sleep(0.1)
+    app.http.request_shutdown()
+    response = await asyncio.wait_for(reader.read(), 10)
+    writer.close()
+    await server
+    return response
+
+
+@pytest.mark.parametrize("engine", ["streams", "protocol"])
+@pytest.mark.parametrize("asgi_middleware", [False, True])
+def test_response_while_draining_closes(engine, asgi_middleware):
+    app = make_app(asgi_middleware)
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.3)
+        return "done"
+
+    response = asyncio.run(
+        drain_with(app, engine, b"GET /slow HTTP/1.1\r\nHost: test\r\n\r\n")
+    )
+    head, _, content = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200")
+    assert b"connection: close" in head.lower()
+    assert content == b"done"
+
+
+@pytest.mark.parametrize("engine", ["streams", "protocol"])
+def test_drain_drops_websockets_that_were_not_accepted(engine):
+    app = make_app()
+
+    @app.ws("/ws")
+    async def pending():
+        await asyncio.sleep(60)
+
+    response = asyncio.run(
+        drain_with(
+            app,
+            engine,
+            b"GET /ws HTTP/1.1\r\nHost: test\r\nUpgrade: websocket\r\n"
+            b"Connection: Upgrade\r\nSec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+            b"Sec-WebSocket-Version: 13\r\n\r\n",
+        )
+    )
+    assert response == b""
+    assert app.http.stats["websockets_closed"] == 0
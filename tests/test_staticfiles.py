@@ -0,0 +1,89 @@
+import asyncio
+import gzip
+
+import pytest
+
+from notturno import Notturno
+from notturno.staticfiles import StaticFiles
+
+
+def call(app, method, path, headers=()):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"test")]
+        + [(key.encode(), value.encode()) for key, value in headers],
+        "http_version": "1.1",
+        "scheme": "http",
+        "client": ("127.0.0.1", 1),
+        "server": ("test", 80),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    return start["status"], headers, body
+
+
+@pytest.fixture
+def app(tmp_path):
+    (tmp_path / "index.html").write_bytes(b"<h1>home</h1>")
+    (tmp_path / "app.js").write_bytes(b"console.log(1);" * 10)
+    (tmp_path / "app.js.gz").write_bytes(gzip.compress(b"console.log(1);" * 10))
+    (tmp_path / "big.bin").write_bytes(b"x" * 4096)
+    app = Notturno()
+    app.merge(StaticFiles("/static", str(tmp_path), max_cached_file_size=1024))
+    return app
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, compressed",
+    [
+        ("gzip", True),
+        ("deflate, gzip;q=0.5", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("GZIP; q=0.0, br", False),
+        ("*;q=0", False),
+        ("br, *;q=0.1, gzip;q=0", False),
+        ("identity", False),
+    ],
+)
+def test_gzip_honours_q_values(app, accept_encoding, compressed):
+    status, headers, _ = call(
+        app, "GET", "/static/app.js", [("Accept-Encoding", accept_encoding)]
+    )
+    assert status == 200
+    assert (headers.get("content-encoding") == "gzip") is compressed
+
+
+@pytest.mark.parametrize(
+    "path, length", [("/static/app.js", 150), ("/static/big.bin", 4096), ("/static/", 13)]
+)
+def test_head(app, path, length):
+    # Twice, so the second request is answered from the cache.
+    for _ in range(2):
+        status, headers, body = call(app, "HEAD", path)
+        assert status == 200
+        assert headers["content-length"] == str(length)
+        assert "etag" in headers
+        assert body == b""
+
+
+def test_head_range(app):
+    status, headers, body = call(app, "HEAD", "/static/big.bin", [("Range", "bytes=0-99")])
+    assert status == 206
+    assert headers["content-length"] == "100"
+    assert headers["content-range"] == "bytes 0-99/4096"
+    assert body == b""
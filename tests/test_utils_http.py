@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from notturno.models.request import Request
+from notturno.utils.http import convert_body, wrap_middleware
+
+
+async def tag(request, call_next):
+    response = await call_next(request)
+    response.headers["X-Tag"] = "1"
+    return response
+
+
+@pytest.mark.parametrize("is_async", [False, True])
+def test_wrap_middleware_is_a_deprecated_alias(is_async):
+    def handler(request):
+        return request.method
+
+    async def async_handler(request):
+        return request.method
+
+    request = Request("GET", "http://test/")
+    with pytest.warns(DeprecationWarning):
+        response = asyncio.run(
+            wrap_middleware(
+                async_handler if is_async else handler,
+                request,
+                convert_body,
+                [tag],
+                arg_name="request",
+            )
+        )
+    assert response.body == b"GET"
+    assert response.headers["X-Tag"] == "1"